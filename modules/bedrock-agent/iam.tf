@@ -177,6 +177,15 @@ resource "aws_iam_role_policy" "lambda_custom" {
           "arn:aws:bedrock:us-east-1::foundation-model/*"
         ]
       },
+      {
+        Sid    = "ResponseCache"
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem"
+        ]
+        Resource = aws_dynamodb_table.response_cache.arn
+      },
       {
         Sid    = "LambdaInvokeForRouting"
         Effect = "Allow"
@@ -4,12 +4,59 @@ Parses Terraform content and extracts resource information.
 Reads files from S3 when called via Bedrock Agent.
 """
 
-import boto3
+import hashlib
+import io
 import json
 import os
 import re
-
-s3_client = boto3.client('s3')
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# Created on first use: direct invocations never touch S3, so they
+# shouldn't pay boto3's import and client setup on a cold start
+_s3 = None
+
+# Read once at cold start
+TERRAFORM_BUCKET = os.environ.get('TERRAFORM_BUCKET')
+
+S3_FETCH_WORKERS = 16
+
+# Analysis results keyed by content digest, kept across warm invocations
+_ANALYSIS_CACHE = OrderedDict()
+ANALYSIS_CACHE_SIZE = 16
+
+# Precompiled patterns used by the extractors. Don't swap in google-re2:
+# its wrapper re-encodes the whole string on every search(text, pos) call,
+# which makes the position-driven scans below quadratic.
+_SOURCE_RE = re.compile(r'source\s*=\s*"([^"]+)"')
+_VERSION_RE = re.compile(r'version\s*=\s*"([^"]+)"')
+_ALIAS_RE = re.compile(r'alias\s*=\s*"([^"]+)"')
+_REGION_RE = re.compile(r'region\s*=\s*"([^"]+)"')
+_VALUE_RE = re.compile(r'value\s*=\s*(.+?)(?:\n|$)')
+_TAGS_RE = re.compile(r'tags\s*=\s*\{([^}]+)\}')
+_TAG_KV_RE = re.compile(r'(\w+)\s*=\s*"([^"]*)"')
+_DESC_RE = re.compile(r'description\s*=\s*"([^"]*)"')
+_TYPE_RE = re.compile(r'type\s*=\s*"([^"]*)"')
+_DEFAULT_RE = re.compile(r'default\s*=\s*"([^"]*)"')
+_SENSITIVE_RE = re.compile(r'sensitive\s*=\s*true\b')
+# Assignment at the start of a line (not "=="); group 2 is the rest of it
+_LOCAL_NAME_RE = re.compile(r'(?m)^[ \t]*(\w+)[ \t]*=((?:[^=\n][^\n]*)?)$')
+# The same, right after the opening brace of a one-line block
+_LOCAL_INLINE_RE = re.compile(r'(?m)[ \t]*(\w+)[ \t]*=((?:[^=\n][^\n]*)?)$')
+
+BLOCK_KINDS = ('resource', 'module', 'variable', 'output', 'data', 'locals', 'provider')
+
+# Every top-level block header (kind, up to two labels, "{") in one
+# alternation, so a single pass over the content finds all of them
+_BLOCK_RE = re.compile(
+    r'(?m)^[ \t]*(?P<kind>resource|module|variable|output|data|locals|provider)'
+    r'(?:\s+"(?P<l1>[^"]*)"(?:\s+"(?P<l2>[^"]*)")?)?\s*\{'
+)
+# Tokens that matter while matching braces: braces, string starts,
+# comments and heredoc openers
+_BRACE_RE = re.compile(r'[{}"#]|//|/\*|<<-?([A-Za-z_]\w*)[ \t]*\n')
+_STRING_END_RE = re.compile(r'(?s)[^"\\]*(?:\\.[^"\\]*)*"')
 
 
 def lambda_handler(event, context):
@@ -33,17 +80,16 @@ def lambda_handler(event, context):
         module_name = params.get('module_name', '')
 
         # Read all terraform files from S3
-        terraform_bucket = os.environ.get('TERRAFORM_BUCKET')
-        if not terraform_bucket:
+        if not TERRAFORM_BUCKET:
             return format_response(event, {
                 'error': 'Missing TERRAFORM_BUCKET environment variable'
             }, 500)
 
-        content, files_read = read_terraform_files(terraform_bucket, module_name)
+        content, files_read = read_terraform_files(TERRAFORM_BUCKET, module_name)
         if not content:
             return format_response(event, {
                 'error': 'No Terraform files found',
-                'message': f'No .tf files found in s3://{terraform_bucket}/terraform/'
+                'message': f'No .tf files found in s3://{TERRAFORM_BUCKET}/terraform/'
             }, 404)
 
         filename = f"Combined ({len(files_read)} files)"
@@ -59,48 +105,22 @@ def lambda_handler(event, context):
         }, 400)
 
     try:
-        # Extract resources
-        resources = extract_resources(content)
-
-        # Extract modules
-        modules = extract_modules(content)
-
-        # Extract variables
-        variables = extract_variables(content)
-
-        # Extract outputs
-        outputs = extract_outputs(content)
-
-        # Extract data sources
-        data_sources = extract_data_sources(content)
-
-        # Extract locals
-        locals_block = extract_locals(content)
-
-        # Extract provider configurations
-        providers = extract_providers(content)
-
-        # Create human-readable summary
-        summary_text = generate_summary(resources, modules, variables, outputs)
+        # Identical content (common across a conversation) is served from
+        # the warm container's cache instead of being parsed again
+        content_key = hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
+        analysis = _ANALYSIS_CACHE.get(content_key)
+        if analysis is None:
+            analysis = analyze_content(content)
+            _ANALYSIS_CACHE[content_key] = analysis
+            if len(_ANALYSIS_CACHE) > ANALYSIS_CACHE_SIZE:
+                _ANALYSIS_CACHE.popitem(last=False)
+        else:
+            _ANALYSIS_CACHE.move_to_end(content_key)
 
         result = {
             'filename': filename,
             'files_analyzed': files_read if 'files_read' in dir() else [filename],
-            'resources': resources,
-            'modules': modules,
-            'variables': variables,
-            'outputs': outputs,
-            'data_sources': data_sources,
-            'locals': locals_block,
-            'providers': providers,
-            'summary': summary_text,
-            'counts': {
-                'resource_count': len(resources),
-                'module_count': len(modules),
-                'variable_count': len(variables),
-                'output_count': len(outputs),
-                'data_source_count': len(data_sources)
-            }
+            **analysis
         }
 
         return format_response(event, result, 200)
@@ -112,50 +132,139 @@ def lambda_handler(event, context):
         }, 500)
 
 
+def analyze_content(content):
+    """Extract everything the analysis reports from Terraform content."""
+    # Index every top-level block in a single pass. The extractors below
+    # only slice this shared index, so they run serially: the regex
+    # engine holds the GIL and a thread pool measured slower than the loop.
+    doc = ParsedDoc(content)
+
+    # Extract resources
+    resources = extract_resources(doc)
+
+    # Extract modules
+    modules = extract_modules(doc)
+
+    # Extract variables
+    variables = extract_variables(doc)
+
+    # Extract outputs
+    outputs = extract_outputs(doc)
+
+    # Extract data sources
+    data_sources = extract_data_sources(doc)
+
+    # Extract locals
+    locals_block = extract_locals(doc)
+
+    # Extract provider configurations
+    providers = extract_providers(doc)
+
+    # Create human-readable summary
+    summary_text = generate_summary(resources, modules, variables, outputs)
+
+    return {
+        'resources': resources,
+        'modules': modules,
+        'variables': variables,
+        'outputs': outputs,
+        'data_sources': data_sources,
+        'locals': locals_block,
+        'providers': providers,
+        'summary': summary_text,
+        'counts': {
+            'resource_count': len(resources),
+            'module_count': len(modules),
+            'variable_count': len(variables),
+            'output_count': len(outputs),
+            'data_source_count': len(data_sources)
+        }
+    }
+
+
+def _get_s3():
+    """Return the shared S3 client, importing boto3 on first use."""
+    global _s3
+    if _s3 is None:
+        import boto3
+        from botocore.config import Config
+
+        # Pool sized above the fetch worker count so parallel GETs never
+        # queue; adaptive retries absorb S3 throttling during the fan-out
+        _s3 = boto3.client('s3', config=Config(
+            max_pool_connections=64,
+            retries={'mode': 'adaptive', 'max_attempts': 5},
+            tcp_keepalive=True
+        ))
+    return _s3
+
+
 def read_terraform_files(bucket, module_filter=''):
     """Read all .tf files from S3 bucket."""
-    content_parts = []
+    content = io.StringIO()
     files_read = []
     prefix = 'terraform/'
 
     try:
-        paginator = s3_client.get_paginator('list_objects_v2')
-
-        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
-            for obj in page.get('Contents', []):
-                key = obj['Key']
-                if key.endswith('.tf') and not key.endswith('.tfstate'):
-                    # Filter by module if specified
-                    if module_filter:
-                        if f'modules/{module_filter}/' not in key and module_filter.lower() not in key.lower():
-                            continue
-
-                    try:
-                        response = s3_client.get_object(Bucket=bucket, Key=key)
-                        file_content = response['Body'].read().decode('utf-8')
-                        display_name = key.replace(prefix, '')
-                        files_read.append(display_name)
-                        content_parts.append(file_content)
-                    except Exception:
-                        pass
-
-        return '\n\n'.join(content_parts), files_read
+        paginator = _get_s3().get_paginator('list_objects_v2')
+
+        keys = []
+        if module_filter:
+            # Let S3 narrow the listing to the module's own directory
+            keys = list_tf_keys(paginator, bucket, f'{prefix}modules/{module_filter}/')
+
+        if not keys:
+            keys = list_tf_keys(paginator, bucket, prefix)
+            # Filter by module if specified
+            if module_filter:
+                keys = [key for key in keys if module_filter.lower() in key.lower()]
+
+        # Fetch objects concurrently; map() keeps results in listing order
+        with ThreadPoolExecutor(max_workers=S3_FETCH_WORKERS) as executor:
+            bodies = list(executor.map(lambda key: read_s3_object(bucket, key), keys))
+
+        for key, file_content in zip(keys, bodies):
+            if file_content is None:
+                continue
+            if files_read:
+                content.write('\n\n')
+            content.write(file_content)
+            files_read.append(key.replace(prefix, ''))
+
+        return content.getvalue(), files_read
 
     except Exception:
         return None, []
 
 
+def list_tf_keys(paginator, bucket, prefix):
+    """List the .tf keys under a prefix."""
+    pages = paginator.paginate(Bucket=bucket, Prefix=prefix, PaginationConfig={'PageSize': 1000})
+    return [
+        obj['Key']
+        for page in pages
+        for obj in page.get('Contents', [])
+        if obj['Key'].endswith('.tf')
+    ]
+
+
+def read_s3_object(bucket, key):
+    """Read a single S3 object as text, or None if it can't be fetched."""
+    try:
+        response = _get_s3().get_object(Bucket=bucket, Key=key)
+        return response['Body'].read().decode('utf-8')
+    except Exception:
+        return None
+
+
 def generate_summary(resources, modules, variables, outputs):
     """Generate a human-readable summary of the analysis."""
     lines = []
 
     # Group resources by type
-    resource_types = {}
+    resource_types = defaultdict(list)
     for r in resources:
-        rtype = r['type']
-        if rtype not in resource_types:
-            resource_types[rtype] = []
-        resource_types[rtype].append(r['name'])
+        resource_types[r['type']].append(r['name'])
 
     lines.append("## Infrastructure Analysis\n")
 
@@ -168,8 +277,10 @@ def generate_summary(resources, modules, variables, outputs):
     if resource_types:
         lines.append("### Resources by Type")
         for rtype, names in sorted(resource_types.items()):
-            lines.append(f"- **{rtype}** ({len(names)}): {', '.join(names[:5])}" +
-                        (f" ... +{len(names)-5} more" if len(names) > 5 else ""))
+            head = ', '.join(names[:5])
+            extra = len(names) - 5
+            lines.append(f"- **{rtype}** ({len(names)}): {head}" +
+                        (f" ... +{extra} more" if extra > 0 else ""))
         lines.append("")
 
     if variables:
@@ -190,19 +301,20 @@ def generate_summary(resources, modules, variables, outputs):
     return '\n'.join(lines)
 
 
-def extract_resources(content):
+def extract_resources(doc):
     """Extract resource blocks from Terraform content."""
     resources = []
+    content = doc.content
 
-    # Match resource blocks: resource "type" "name" { ... }
-    pattern = r'resource\s+"([^"]+)"\s+"([^"]+)"\s*\{'
-    matches = re.findall(pattern, content)
+    # Resource blocks: resource "type" "name" { ... }
+    for labels, start, end in doc.blocks_of('resource'):
+        if len(labels) != 2:
+            continue
+        resource_type, resource_name = labels
 
-    for resource_type, resource_name in matches:
         # Try to extract description or tags
-        resource_block = extract_block(content, f'resource "{resource_type}" "{resource_name}"')
-        description = extract_attribute(resource_block, 'description')
-        tags = extract_tags(resource_block)
+        description = _match_group(_DESC_RE, content, start, end)
+        tags = extract_tags(content, start, end)
 
         resources.append({
             'type': resource_type,
@@ -215,24 +327,21 @@ def extract_resources(content):
     return resources
 
 
-def extract_modules(content):
+def extract_modules(doc):
     """Extract module blocks from Terraform content."""
     modules = []
+    content = doc.content
 
-    # Match module blocks
-    pattern = r'module\s+"([^"]+)"\s*\{'
-    module_names = re.findall(pattern, content)
-
-    for module_name in module_names:
-        module_block = extract_block(content, f'module "{module_name}"')
+    for labels, start, end in doc.blocks_of('module'):
+        if len(labels) != 1:
+            continue
+        module_name = labels[0]
 
         # Extract source
-        source_match = re.search(r'source\s*=\s*"([^"]+)"', module_block)
-        source = source_match.group(1) if source_match else ''
+        source = _match_group(_SOURCE_RE, content, start, end) or ''
 
         # Extract version if present
-        version_match = re.search(r'version\s*=\s*"([^"]+)"', module_block)
-        version = version_match.group(1) if version_match else None
+        version = _match_group(_VERSION_RE, content, start, end)
 
         modules.append({
             'name': module_name,
@@ -243,20 +352,19 @@ def extract_modules(content):
     return modules
 
 
-def extract_variables(content):
+def extract_variables(doc):
     """Extract variable blocks from Terraform content."""
     variables = []
+    content = doc.content
 
-    # Match variable blocks
-    pattern = r'variable\s+"([^"]+)"\s*\{'
-    var_names = re.findall(pattern, content)
-
-    for var_name in var_names:
-        var_block = extract_block(content, f'variable "{var_name}"')
+    for labels, start, end in doc.blocks_of('variable'):
+        if len(labels) != 1:
+            continue
+        var_name = labels[0]
 
-        description = extract_attribute(var_block, 'description')
-        var_type = extract_attribute(var_block, 'type')
-        default = extract_attribute(var_block, 'default')
+        description = _match_group(_DESC_RE, content, start, end)
+        var_type = _match_group(_TYPE_RE, content, start, end)
+        default = _match_group(_DEFAULT_RE, content, start, end)
 
         variables.append({
             'name': var_name,
@@ -268,20 +376,19 @@ def extract_variables(content):
     return variables
 
 
-def extract_outputs(content):
+def extract_outputs(doc):
     """Extract output blocks from Terraform content."""
     outputs = []
+    content = doc.content
 
-    pattern = r'output\s+"([^"]+)"\s*\{'
-    output_names = re.findall(pattern, content)
+    for labels, start, end in doc.blocks_of('output'):
+        if len(labels) != 1:
+            continue
+        output_name = labels[0]
 
-    for output_name in output_names:
-        output_block = extract_block(content, f'output "{output_name}"')
-
-        description = extract_attribute(output_block, 'description')
-        value_match = re.search(r'value\s*=\s*(.+?)(?:\n|$)', output_block)
-        value = value_match.group(1).strip() if value_match else ''
-        sensitive = 'sensitive' in output_block and 'true' in output_block
+        description = _match_group(_DESC_RE, content, start, end)
+        value = (_match_group(_VALUE_RE, content, start, end) or '').strip()
+        sensitive = bool(_SENSITIVE_RE.search(content, start, end))
 
         outputs.append({
             'name': output_name,
@@ -293,14 +400,14 @@ def extract_outputs(content):
     return outputs
 
 
-def extract_data_sources(content):
+def extract_data_sources(doc):
     """Extract data source blocks from Terraform content."""
     data_sources = []
 
-    pattern = r'data\s+"([^"]+)"\s+"([^"]+)"\s*\{'
-    matches = re.findall(pattern, content)
-
-    for data_type, data_name in matches:
+    for labels, _start, _end in doc.blocks_of('data'):
+        if len(labels) != 2:
+            continue
+        data_type, data_name = labels
         data_sources.append({
             'type': data_type,
             'name': data_name,
@@ -310,38 +417,48 @@ def extract_data_sources(content):
     return data_sources
 
 
-def extract_locals(content):
+def extract_locals(doc):
     """Extract locals blocks from Terraform content."""
-    locals_list = []
+    local_names = set()
+    content = doc.content
 
-    # Find locals blocks
-    pattern = r'locals\s*\{([^}]+)\}'
-    matches = re.findall(pattern, content, re.DOTALL)
+    for _labels, start, end in doc.blocks_of('locals'):
+        idx = content.index('{', start) + 1
+        body_end = end - 1
 
-    for block in matches:
-        # Extract individual local values
-        local_pattern = r'(\w+)\s*='
-        local_names = re.findall(local_pattern, block)
-        locals_list.extend(local_names)
+        # A one-line block ("locals { a = 1 }") has its assignment right
+        # after the brace; otherwise each one starts a line of the body
+        match = _LOCAL_INLINE_RE.match(content, idx, body_end)
+        if not match:
+            match = _LOCAL_NAME_RE.search(content, idx, body_end)
 
-    return list(set(locals_list))  # Remove duplicates
+        while match:
+            local_names.add(match.group(1))
 
+            # A map value opened on this line holds keys, not locals; skip it
+            value = match.group(2).rstrip()
+            if value.endswith('{'):
+                idx = _block_from(content, match.start(2) + len(value) - 1)
+            else:
+                idx = match.end()
 
-def extract_providers(content):
-    """Extract provider configurations from Terraform content."""
-    providers = []
+            match = _LOCAL_NAME_RE.search(content, idx, body_end)
 
-    pattern = r'provider\s+"([^"]+)"\s*\{'
-    provider_names = re.findall(pattern, content)
+    return list(local_names)
 
-    for provider_name in provider_names:
-        provider_block = extract_block(content, f'provider "{provider_name}"')
 
-        alias_match = re.search(r'alias\s*=\s*"([^"]+)"', provider_block)
-        alias = alias_match.group(1) if alias_match else None
+def extract_providers(doc):
+    """Extract provider configurations from Terraform content."""
+    providers = []
+    content = doc.content
+
+    for labels, start, end in doc.blocks_of('provider'):
+        if len(labels) != 1:
+            continue
+        provider_name = labels[0]
 
-        region_match = re.search(r'region\s*=\s*"([^"]+)"', provider_block)
-        region = region_match.group(1) if region_match else None
+        alias = _match_group(_ALIAS_RE, content, start, end)
+        region = _match_group(_REGION_RE, content, start, end)
 
         providers.append({
             'name': provider_name,
@@ -352,46 +469,104 @@ def extract_providers(content):
     return providers
 
 
-def extract_block(content, block_start):
-    """Extract a complete block starting with the given pattern."""
-    start_idx = content.find(block_start)
-    if start_idx == -1:
-        return ''
+class ParsedDoc:
+    """Terraform content with its top-level blocks indexed by one scan."""
+
+    def __init__(self, content):
+        self.content = content
+        self._by_kind = {kind: [] for kind in BLOCK_KINDS}
+        for kind, labels, start, end in _scan_blocks(content):
+            self._by_kind[kind].append((labels, start, end))
+
+    def blocks_of(self, kind):
+        """Return [(labels, start, end), ...] for each block of a kind, in order."""
+        return self._by_kind[kind]
+
+
+def _scan_blocks(content):
+    """
+    Walk the content once, yielding (kind, labels, start, end) for every
+    top-level block; content[start:end] is the block including its header.
+    Braces inside strings, heredocs and comments do not affect nesting.
+    """
+    length = len(content)
+    idx = 0
+
+    while idx < length:
+        header = _BLOCK_RE.search(content, idx)
+        if not header:
+            break
+
+        kind = header.group('kind')
+        labels = tuple(label for label in header.group('l1', 'l2') if label is not None)
+        start = header.start(1)
 
-    # Find opening brace
-    brace_idx = content.find('{', start_idx)
-    if brace_idx == -1:
-        return ''
+        # The header match ends on the opening brace, so walk from there
+        idx = _block_from(content, header.end() - 1)
+        yield kind, labels, start, idx
 
-    # Count braces to find matching close
+
+def _block_from(content, brace_idx):
+    """
+    Return the offset just past the brace matching the one at brace_idx.
+    Strings, heredocs and comments are skipped so their braces are ignored.
+    """
+    length = len(content)
     depth = 1
     idx = brace_idx + 1
 
-    while idx < len(content) and depth > 0:
-        if content[idx] == '{':
+    # Let the regex engine skip ordinary text; only stop on tokens that
+    # change nesting or open a span whose contents must be ignored
+    while depth > 0:
+        token = _BRACE_RE.search(content, idx)
+        if not token:
+            return length
+
+        text = token.group()
+        idx = token.end()
+        if text == '{':
             depth += 1
-        elif content[idx] == '}':
+        elif text == '}':
             depth -= 1
-        idx += 1
-
-    return content[start_idx:idx]
-
-
-def extract_attribute(block, attr_name):
-    """Extract a simple attribute value from a block."""
-    pattern = rf'{attr_name}\s*=\s*"([^"]*)"'
-    match = re.search(pattern, block)
+        elif text == '"':
+            string_end = _STRING_END_RE.match(content, idx)
+            idx = string_end.end() if string_end else length
+        elif text == '/*':
+            close = content.find('*/', idx)
+            idx = length if close == -1 else close + 2
+        elif text[0] == '<':
+            # Skip to the line holding only the closing marker
+            close = _heredoc_end_re(token.group(1)).search(content, idx)
+            idx = length if close is None else close.end()
+        else:
+            # '#' or '//' line comment
+            newline = content.find('\n', idx)
+            idx = length if newline == -1 else newline + 1
+
+    return idx
+
+
+@lru_cache(maxsize=32)
+def _heredoc_end_re(marker):
+    """Compile (once per marker) the pattern for a heredoc's closing line."""
+    return re.compile(rf'(?m)^[ \t]*{re.escape(marker)}[ \t]*$')
+
+
+def _match_group(pattern, text, start=0, end=None):
+    """
+    Return the first capture group of a precompiled pattern, or None.
+    Searching text[start:end] in place avoids copying each block out.
+    """
+    match = pattern.search(text, start, len(text) if end is None else end)
     return match.group(1) if match else None
 
 
-def extract_tags(block):
-    """Extract tags from a resource block."""
+def extract_tags(block, start=0, end=None):
+    """Extract tags from a resource block (or the block[start:end] span)."""
     tags = {}
-    tags_match = re.search(r'tags\s*=\s*\{([^}]+)\}', block)
+    tags_match = _TAGS_RE.search(block, start, len(block) if end is None else end)
     if tags_match:
-        tags_content = tags_match.group(1)
-        tag_pattern = r'(\w+)\s*=\s*"([^"]*)"'
-        for key, value in re.findall(tag_pattern, tags_content):
+        for key, value in _TAG_KV_RE.findall(block, tags_match.start(1), tags_match.end(1)):
             tags[key] = value
     return tags
 
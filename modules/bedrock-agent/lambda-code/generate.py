@@ -6,16 +6,71 @@ Saves full documentation to S3 with pre-signed download URLs.
 """
 
 import boto3
+import hashlib
+import io
 import json
 import os
+import time
+from botocore.config import Config
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-s3_client = boto3.client('s3')
-bedrock_runtime = boto3.client('bedrock-runtime')
+# Shared client config: a pool large enough that parallel S3 calls never
+# queue, adaptive retries for throttling, and keep-alive on warm containers
+BOTO_CONFIG = Config(
+    max_pool_connections=64,
+    retries={'mode': 'adaptive', 'max_attempts': 5},
+    tcp_keepalive=True
+)
 
-# Output bucket for generated docs
+s3_client = boto3.client('s3', config=BOTO_CONFIG)
+bedrock_runtime = boto3.client('bedrock-runtime', config=BOTO_CONFIG)
+dynamodb_client = boto3.client('dynamodb', config=BOTO_CONFIG)
+
+S3_FETCH_WORKERS = 16
+
+# Upper bound on the Terraform excerpt sent to Bedrock (characters)
+MAX_PROMPT_CONTENT = 50000
+
+# Below this size there's nothing for Claude to summarize
+MIN_BEDROCK_CONTENT = 200
+
+# Generated docs keyed by content hash; survives across warm invocations
+_DOCS_CACHE = OrderedDict()
+DOCS_CACHE_SIZE = 16
+
+BEDROCK_MODEL_ID = 'us.anthropic.claude-sonnet-4-20250514-v1:0'
+
+# Bedrock responses shared across containers, keyed by model, prompt and
+# Terraform content hash. Optional: caching is skipped when unset.
+RESPONSE_CACHE_TABLE = os.environ.get('RESPONSE_CACHE_TABLE')
+RESPONSE_CACHE_TTL = 3600
+
+# Static instructions sent as the system prompt ahead of a cache point, so
+# Bedrock reuses their prefill; only the Terraform content varies per call
+DOCS_INSTRUCTIONS = """Analyze the Terraform configuration provided by the user and create a CONCISE markdown summary.
+Keep it under 1500 characters. Focus on the most important aspects.
+
+Include these sections (keep each brief):
+1. **Overview** - 2-3 sentences about what this infrastructure does
+2. **Key Components** - Bullet list of main resources (VPCs, instances, firewalls)
+3. **Network Design** - Brief description of network architecture
+4. **Security** - Key security features (firewalls, security groups)
+5. **Outputs** - What values/endpoints are exposed
+
+Use markdown formatting. Be concise and informative."""
+
+# Buckets from the Lambda environment, read once at cold start
+TERRAFORM_BUCKET = os.environ.get('TERRAFORM_BUCKET')
 OUTPUT_BUCKET = os.environ.get('OUTPUT_BUCKET')
 
+# Presigned URL for the stable "latest" key, reused across warm
+# invocations. Only reused for the first 300s of its 1h signature, so a
+# link handed out always has at least 55 minutes left.
+_LATEST_URL_CACHE = {'url': None, 'signed_at': 0}
+LATEST_URL_REUSE_SECONDS = 300
+
 
 def lambda_handler(event, context):
     """
@@ -23,9 +78,7 @@ def lambda_handler(event, context):
     Returns documentation directly in the response for display in chat.
     """
 
-    terraform_bucket = os.environ.get('TERRAFORM_BUCKET')
-
-    if not terraform_bucket:
+    if not TERRAFORM_BUCKET:
         return format_response(event, {
             'error': 'Missing environment variable',
             'message': 'TERRAFORM_BUCKET must be configured'
@@ -33,12 +86,12 @@ def lambda_handler(event, context):
 
     try:
         # Read Terraform files from S3
-        terraform_content = read_terraform_files(terraform_bucket)
+        terraform_content = read_terraform_files(TERRAFORM_BUCKET)
 
         if not terraform_content:
             return format_response(event, {
                 'error': 'No Terraform files found',
-                'message': f'No .tf files found in s3://{terraform_bucket}/terraform/'
+                'message': f'No .tf files found in s3://{TERRAFORM_BUCKET}/terraform/'
             }, 404)
 
         # Generate concise documentation using Bedrock
@@ -71,14 +124,23 @@ def save_documentation_to_s3(documentation, terraform_content):
     timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
 
     try:
-        # Save main documentation
         doc_key = f'docs/INFRASTRUCTURE-{timestamp}.md'
-        s3_client.put_object(
-            Bucket=OUTPUT_BUCKET,
-            Key=doc_key,
-            Body=documentation.encode('utf-8'),
-            ContentType='text/markdown'
-        )
+        latest_key = 'docs/INFRASTRUCTURE-latest.md'
+        body = documentation.encode('utf-8')
+
+        # Upload the main documentation and the "latest" version together;
+        # both threads share the same encoded bytes
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            doc_upload = executor.submit(
+                s3_client.put_object,
+                Bucket=OUTPUT_BUCKET, Key=doc_key, Body=body, ContentType='text/markdown'
+            )
+            latest_upload = executor.submit(
+                s3_client.put_object,
+                Bucket=OUTPUT_BUCKET, Key=latest_key, Body=body, ContentType='text/markdown'
+            )
+
+        doc_upload.result()
 
         # Generate pre-signed URL (valid for 1 hour)
         doc_url = s3_client.generate_presigned_url(
@@ -92,20 +154,17 @@ def save_documentation_to_s3(documentation, terraform_content):
             'url': doc_url
         })
 
-        # Also save a "latest" version
-        latest_key = 'docs/INFRASTRUCTURE-latest.md'
-        s3_client.put_object(
-            Bucket=OUTPUT_BUCKET,
-            Key=latest_key,
-            Body=documentation.encode('utf-8'),
-            ContentType='text/markdown'
-        )
-
-        latest_url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': OUTPUT_BUCKET, 'Key': latest_key},
-            ExpiresIn=3600
-        )
+        latest_upload.result()
+
+        latest_url = _LATEST_URL_CACHE['url']
+        if time.time() - _LATEST_URL_CACHE['signed_at'] >= LATEST_URL_REUSE_SECONDS:
+            latest_url = s3_client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': OUTPUT_BUCKET, 'Key': latest_key},
+                ExpiresIn=3600
+            )
+            _LATEST_URL_CACHE['url'] = latest_url
+            _LATEST_URL_CACHE['signed_at'] = time.time()
         download_links.append({
             'name': 'INFRASTRUCTURE-latest.md',
             'description': 'Latest documentation (always updated)',
@@ -122,79 +181,173 @@ def save_documentation_to_s3(documentation, terraform_content):
 def read_terraform_files(bucket):
     """Read all .tf files from S3 bucket and return summary."""
 
-    content_parts = []
+    content = io.StringIO()
     prefix = 'terraform/'
     file_list = []
 
     try:
         paginator = s3_client.get_paginator('list_objects_v2')
 
-        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        objects = []
+        pages = paginator.paginate(Bucket=bucket, Prefix=prefix, PaginationConfig={'PageSize': 1000})
+        for page in pages:
             for obj in page.get('Contents', []):
                 key = obj['Key']
-                if key.endswith('.tf') and not key.endswith('.tfstate'):
-                    try:
-                        response = s3_client.get_object(Bucket=bucket, Key=key)
-                        file_content = response['Body'].read().decode('utf-8')
-                        display_name = key.replace(prefix, '')
-                        file_list.append(display_name)
-                        # Only include first 500 chars per file to keep prompt small
-                        truncated = file_content[:500] + ('...' if len(file_content) > 500 else '')
-                        content_parts.append(f"### {display_name}\n```hcl\n{truncated}\n```")
-                    except Exception:
-                        pass
-
-        return '\n'.join(content_parts) if content_parts else None
+                if key.endswith('.tf'):
+                    objects.append((key, obj['Size']))
+
+        # Fetch only the excerpt of each object, concurrently; map() keeps
+        # results in listing order
+        with ThreadPoolExecutor(max_workers=S3_FETCH_WORKERS) as executor:
+            bodies = list(executor.map(
+                lambda item: read_s3_object(bucket, item[0], item[1], 500),
+                objects
+            ))
+
+        for (key, size), file_content in zip(objects, bodies):
+            if file_content is None:
+                continue
+            display_name = key.replace(prefix, '')
+            # Only include first 500 chars per file to keep prompt small
+            truncated = file_content[:500]
+            ellipsis = '...' if size > 500 else ''
+
+            # Stop once the prompt budget is spent; later files won't fit
+            entry_size = len(display_name) + len(truncated) + len(ellipsis) + 17  # header, fences, separator
+            if file_list and content.tell() + entry_size > MAX_PROMPT_CONTENT:
+                break
+
+            if file_list:
+                content.write('\n')
+            content.write('### ')
+            content.write(display_name)
+            content.write('\n```hcl\n')
+            content.write(truncated)
+            content.write(ellipsis)
+            content.write('\n```')
+            file_list.append(display_name)
+
+        return content.getvalue() if file_list else None
 
     except Exception:
         return None
 
 
-def generate_concise_docs(terraform_content):
-    """Use Bedrock to generate concise documentation suitable for chat."""
+def read_s3_object(bucket, key, size, max_bytes):
+    """Read up to max_bytes of an S3 object as text, or None if it can't be fetched."""
+    try:
+        if size > max_bytes:
+            # Range GET so large files don't transfer bytes we'd discard.
+            # Not used for small objects: S3 rejects ranges on empty ones.
+            response = s3_client.get_object(
+                Bucket=bucket, Key=key, Range=f'bytes=0-{max_bytes - 1}'
+            )
+        else:
+            response = s3_client.get_object(Bucket=bucket, Key=key)
+        # Bounded read in case the object grew since it was listed; the
+        # cut may land mid-character
+        return response['Body'].read(max_bytes).decode('utf-8', errors='replace')
+    except Exception:
+        return None
 
-    prompt = f"""Analyze this Terraform configuration and create a CONCISE markdown summary.
-Keep it under 1500 characters. Focus on the most important aspects.
 
-Include these sections (keep each brief):
-1. **Overview** - 2-3 sentences about what this infrastructure does
-2. **Key Components** - Bullet list of main resources (VPCs, instances, firewalls)
-3. **Network Design** - Brief description of network architecture
-4. **Security** - Key security features (firewalls, security groups)
-5. **Outputs** - What values/endpoints are exposed
+def generate_concise_docs(terraform_content):
+    """Use Bedrock to generate concise documentation suitable for chat."""
 
-Use markdown formatting. Be concise and informative.
+    if len(terraform_content) < MIN_BEDROCK_CONTENT:
+        return generate_basic_docs(terraform_content)
 
-Terraform Configuration:
-{terraform_content}
+    content_hash = hashlib.blake2b(terraform_content.encode('utf-8'), digest_size=16).hexdigest()
+    if content_hash in _DOCS_CACHE:
+        _DOCS_CACHE.move_to_end(content_hash)
+        return _DOCS_CACHE[content_hash]
 
-Generate the concise documentation:"""
+    cache_key = f"{BEDROCK_MODEL_ID}#docs#{content_hash}"
 
     try:
-        response = bedrock_runtime.invoke_model(
-            modelId='us.anthropic.claude-sonnet-4-20250514-v1:0',
-            contentType='application/json',
-            accept='application/json',
-            body=json.dumps({
-                'anthropic_version': 'bedrock-2023-05-31',
-                'max_tokens': 1000,  # Keep response small
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ]
-            })
-        )
+        documentation = get_cached_response(cache_key)
+        if documentation is None:
+            documentation = converse_with_cache(
+                DOCS_INSTRUCTIONS,
+                f"Terraform Configuration:\n{terraform_content}\n\nGenerate the concise documentation:",
+                max_tokens=1000  # Keep response small
+            )
+            put_cached_response(cache_key, documentation)
 
-        response_body = json.loads(response['body'].read())
-        return response_body['content'][0]['text']
+        _DOCS_CACHE[content_hash] = documentation
+        if len(_DOCS_CACHE) > DOCS_CACHE_SIZE:
+            _DOCS_CACHE.popitem(last=False)
+
+        return documentation
 
     except Exception as e:
         # Fallback to basic documentation
         return generate_basic_docs(terraform_content)
 
 
+def converse_with_cache(system_prompt, user_prompt, max_tokens):
+    """
+    Call Claude through the Converse API with the system prompt marked as a
+    cacheable prefix. Returns the response text.
+    """
+    response = bedrock_runtime.converse(
+        modelId=BEDROCK_MODEL_ID,
+        system=[
+            {'text': system_prompt},
+            {'cachePoint': {'type': 'default'}}
+        ],
+        messages=[
+            {
+                'role': 'user',
+                'content': [{'text': user_prompt}]
+            }
+        ],
+        inferenceConfig={'maxTokens': max_tokens}
+    )
+
+    usage = response.get('usage', {})
+    print(f"Bedrock usage: input={usage.get('inputTokens', 0)} "
+          f"cache_read={usage.get('cacheReadInputTokens', 0)} "
+          f"cache_write={usage.get('cacheWriteInputTokens', 0)}")
+
+    return response['output']['message']['content'][0]['text']
+
+
+def get_cached_response(cache_key):
+    """Look up a stored Bedrock response, or None on a miss or error."""
+    if not RESPONSE_CACHE_TABLE:
+        return None
+    try:
+        item = dynamodb_client.get_item(
+            TableName=RESPONSE_CACHE_TABLE,
+            Key={'cache_key': {'S': cache_key}}
+        ).get('Item')
+        # TTL deletion is lazy, so expired items can still be returned
+        if not item or int(item['expires_at']['N']) < time.time():
+            return None
+        return item['response']['S']
+    except Exception as e:
+        print(f"Response cache lookup failed: {e}")
+        return None
+
+
+def put_cached_response(cache_key, response_text):
+    """Store a Bedrock response for RESPONSE_CACHE_TTL seconds."""
+    if not RESPONSE_CACHE_TABLE:
+        return
+    try:
+        dynamodb_client.put_item(
+            TableName=RESPONSE_CACHE_TABLE,
+            Item={
+                'cache_key': {'S': cache_key},
+                'response': {'S': response_text},
+                'expires_at': {'N': str(int(time.time()) + RESPONSE_CACHE_TTL)}
+            }
+        )
+    except Exception as e:
+        print(f"Response cache write failed: {e}")
+
+
 def generate_basic_docs(terraform_content):
     """Generate basic documentation without Bedrock (fallback)."""
 
@@ -5,12 +5,136 @@ The diagram can be rendered in chat UI using a Mermaid renderer.
 """
 
 import boto3
+import hashlib
 import json
 import os
+import time
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 
-s3_client = boto3.client('s3')
-bedrock_runtime = boto3.client('bedrock-runtime')
-ec2_client = boto3.client('ec2')
+# Shared client config: a pool large enough that parallel S3 calls never
+# queue, adaptive retries for throttling, and keep-alive on warm containers
+BOTO_CONFIG = Config(
+    max_pool_connections=64,
+    retries={'mode': 'adaptive', 'max_attempts': 5},
+    tcp_keepalive=True
+)
+
+s3_client = boto3.client('s3', config=BOTO_CONFIG)
+bedrock_runtime = boto3.client('bedrock-runtime', config=BOTO_CONFIG)
+dynamodb_client = boto3.client('dynamodb', config=BOTO_CONFIG)
+
+# Buckets from the Lambda environment, read once at cold start
+TERRAFORM_BUCKET = os.environ.get('TERRAFORM_BUCKET')
+STATE_BUCKET = os.environ.get('STATE_BUCKET', TERRAFORM_BUCKET)
+
+S3_FETCH_WORKERS = 16
+
+# Below this size there's nothing for Claude to draw
+MIN_BEDROCK_CONTENT = 200
+
+BEDROCK_MODEL_ID = 'us.anthropic.claude-sonnet-4-20250514-v1:0'
+
+# Bedrock responses shared across containers, keyed by model, prompt and
+# Terraform content hash. Optional: caching is skipped when unset.
+RESPONSE_CACHE_TABLE = os.environ.get('RESPONSE_CACHE_TABLE')
+RESPONSE_CACHE_TTL = 3600
+
+# 'optimized' requests Bedrock latency-optimized inference. It can't be
+# combined with a cachePoint, so that mode gives up prompt caching: worth
+# it for one-shot diagram requests on a model that supports it, while
+# 'standard' keeps the cached system prompt for repeated requests.
+BEDROCK_LATENCY = os.environ.get('BEDROCK_LATENCY', 'standard')
+
+# Static instructions sent as the system prompt ahead of a cache point, so
+# Bedrock reuses their prefill. The Terraform content varies per call and
+# goes in the user message after it.
+MERMAID_INSTRUCTIONS = """Analyze the Terraform configuration provided by the user and create a Mermaid diagram.
+
+Requirements:
+1. Use Mermaid flowchart syntax (graph TD or graph LR)
+2. Keep it clean and readable - max 20-25 nodes
+3. Use meaningful labels (not just resource IDs)
+4. Group related resources using subgraphs for VPCs
+5. Show connections between resources with arrows
+6. Use appropriate shapes: [(database)], {decision}, [process], ([service])
+
+Example format:
+```mermaid
+graph TD
+    subgraph VPC1["VPC 1 - 10.0.0.0/16"]
+        IGW1[Internet Gateway]
+        PUB1[Public Subnet<br/>10.0.1.0/24]
+        PRIV1[Private Subnet<br/>10.0.2.0/24]
+        FW1{FortiGate Firewall}
+        EC2_1([Ubuntu Server])
+    end
+
+    Internet((Internet)) --> IGW1
+    IGW1 --> PUB1
+    PUB1 --> FW1
+    FW1 --> PRIV1
+    PRIV1 --> EC2_1
+```"""
+
+ASCII_INSTRUCTIONS = """Analyze the Terraform configuration provided by the user and create a simple ASCII diagram.
+
+Requirements:
+1. Use simple ASCII box characters: +, -, |, =
+2. Keep it clean and readable - fit within 80 characters width
+3. Use meaningful labels
+4. Show VPCs as large boxes containing their resources
+5. Show VPN tunnel connection between FortiGates with === or ~~~
+6. Use clear arrows for traffic flow: --> or <-->
+
+Example format:
+```
+                              INTERNET
+                                 |
+            +--------------------+--------------------+
+            |                                         |
+    +-------v--------+                       +--------v-------+
+    |    VPC 1       |                       |     VPC 2      |
+    | 10.0.0.0/16    |                       | 10.100.0.0/16  |
+    |                |                       |                |
+    | +------------+ |                       | +------------+ |
+    | | FortiGate1 |=========================| FortiGate2 | |
+    | | 3.x.x.x    | |     VPN Tunnel       | | 3.x.x.x    | |
+    | +-----+------+ |                       | +-----+------+ |
+    |       |        |                       |       |        |
+    | +-----v------+ |                       | +-----v------+ |
+    | | Ubuntu-1   | |                       | | Ubuntu-2   | |
+    | | 10.0.1.10  | |                       | | 10.100.1.10| |
+    | +------------+ |                       | +------------+ |
+    +----------------+                       +----------------+
+```"""
+
+# Focus line per diagram_type, appended to the instructions so each
+# (format, diagram_type) pair gets its own byte-identical system prompt
+# and its own cache entry; unknown types fall back to architecture
+MERMAID_FOCUS = {
+    'network': "Focus on VPCs, subnets, route tables, internet gateways, NAT gateways, and network connectivity.",
+    'security': "Focus on security groups, firewalls, IAM roles, and security boundaries.",
+    'compute': "Focus on EC2 instances, load balancers, and compute resources.",
+    'architecture': "Show the complete infrastructure including VPCs, subnets, EC2 instances, firewalls, and their connections."
+}
+
+ASCII_FOCUS = {
+    'network': "Focus on VPCs, subnets, route tables, internet gateways, and network connectivity.",
+    'security': "Focus on security groups, firewalls, and security boundaries.",
+    'compute': "Focus on EC2 instances and compute resources.",
+    'architecture': "Show the complete infrastructure including VPCs, subnets, EC2 instances, firewalls, and VPN connections."
+}
+
+MERMAID_SYSTEM_PROMPTS = {
+    diagram_type: f"{MERMAID_INSTRUCTIONS}\n\n{focus}"
+    for diagram_type, focus in MERMAID_FOCUS.items()
+}
+
+ASCII_SYSTEM_PROMPTS = {
+    diagram_type: f"{ASCII_INSTRUCTIONS}\n\n{focus}"
+    for diagram_type, focus in ASCII_FOCUS.items()
+}
 
 
 def lambda_handler(event, context):
@@ -19,9 +143,7 @@ def lambda_handler(event, context):
     Returns the diagram code for rendering in chat.
     """
 
-    terraform_bucket = os.environ.get('TERRAFORM_BUCKET')
-
-    if not terraform_bucket:
+    if not TERRAFORM_BUCKET:
         return format_response(event, {
             'error': 'Missing environment variable',
             'message': 'TERRAFORM_BUCKET must be configured'
@@ -49,8 +171,7 @@ def lambda_handler(event, context):
     try:
         # For "deployed" diagram type, read from live infrastructure
         if diagram_type == 'deployed':
-            state_bucket = os.environ.get('STATE_BUCKET', terraform_bucket)
-            deployed_info = get_deployed_infrastructure(state_bucket)
+            deployed_info = get_deployed_infrastructure(STATE_BUCKET)
 
             if not deployed_info:
                 return format_response(event, {
@@ -62,12 +183,12 @@ def lambda_handler(event, context):
             message = 'Deployed infrastructure diagram generated from live state.'
         else:
             # Read Terraform files from S3
-            terraform_content = read_terraform_files(terraform_bucket)
+            terraform_content = read_terraform_files(TERRAFORM_BUCKET)
 
             if not terraform_content:
                 return format_response(event, {
                     'error': 'No Terraform files found',
-                    'message': f'No .tf files found in s3://{terraform_bucket}/terraform/'
+                    'message': f'No .tf files found in s3://{TERRAFORM_BUCKET}/terraform/'
                 }, 404)
 
             # Generate diagram using Bedrock
@@ -104,99 +225,90 @@ def read_terraform_files(bucket):
     try:
         paginator = s3_client.get_paginator('list_objects_v2')
 
-        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        objects = []
+        pages = paginator.paginate(Bucket=bucket, Prefix=prefix, PaginationConfig={'PageSize': 1000})
+        for page in pages:
             for obj in page.get('Contents', []):
                 key = obj['Key']
-                if key.endswith('.tf') and not key.endswith('.tfstate'):
-                    try:
-                        response = s3_client.get_object(Bucket=bucket, Key=key)
-                        file_content = response['Body'].read().decode('utf-8')
-                        display_name = key.replace(prefix, '')
-                        # Include more content for diagram generation
-                        truncated = file_content[:1000] + ('...' if len(file_content) > 1000 else '')
-                        content_parts.append(f"### {display_name}\n```hcl\n{truncated}\n```")
-                    except Exception:
-                        pass
-
-        return '\n'.join(content_parts) if content_parts else None
+                if key.endswith('.tf'):
+                    objects.append((key, obj['Size']))
+
+        # Fetch only the excerpt of each object, concurrently; map() keeps
+        # results in listing order
+        with ThreadPoolExecutor(max_workers=S3_FETCH_WORKERS) as executor:
+            bodies = list(executor.map(
+                lambda item: read_s3_object(bucket, item[0], item[1], 1000),
+                objects
+            ))
+
+        for (key, size), file_content in zip(objects, bodies):
+            if file_content is None:
+                continue
+            display_name = key.replace(prefix, '')
+            # Include more content for diagram generation
+            ellipsis = '...' if size > 1000 else ''
+            # Extend with the fragments so the prompt is assembled by a
+            # single join rather than a formatted string per file
+            if content_parts:
+                content_parts.append('\n')
+            content_parts.extend(('### ', display_name, '\n```hcl\n', file_content[:1000], ellipsis, '\n```'))
+
+        return ''.join(content_parts) if content_parts else None
 
     except Exception:
         return None
 
 
-def generate_mermaid_diagram(terraform_content, diagram_type):
-    """Use Bedrock to generate a Mermaid diagram from Terraform code."""
-
-    if diagram_type == 'network':
-        focus = "Focus on VPCs, subnets, route tables, internet gateways, NAT gateways, and network connectivity."
-    elif diagram_type == 'security':
-        focus = "Focus on security groups, firewalls, IAM roles, and security boundaries."
-    elif diagram_type == 'compute':
-        focus = "Focus on EC2 instances, load balancers, and compute resources."
-    else:  # architecture (default)
-        focus = "Show the complete infrastructure including VPCs, subnets, EC2 instances, firewalls, and their connections."
+def read_s3_object(bucket, key, size, max_bytes):
+    """Read up to max_bytes of an S3 object as text, or None if it can't be fetched."""
+    try:
+        if size > max_bytes:
+            # Range GET so large files don't transfer bytes we'd discard.
+            # Not used for small objects: S3 rejects ranges on empty ones.
+            response = s3_client.get_object(
+                Bucket=bucket, Key=key, Range=f'bytes=0-{max_bytes - 1}'
+            )
+        else:
+            response = s3_client.get_object(Bucket=bucket, Key=key)
+        # Bounded read in case the object grew since it was listed; the
+        # cut may land mid-character
+        return response['Body'].read(max_bytes).decode('utf-8', errors='replace')
+    except Exception:
+        return None
 
-    prompt = f"""Analyze this Terraform configuration and create a Mermaid diagram.
-{focus}
 
-Requirements:
-1. Use Mermaid flowchart syntax (graph TD or graph LR)
-2. Keep it clean and readable - max 20-25 nodes
-3. Use meaningful labels (not just resource IDs)
-4. Group related resources using subgraphs for VPCs
-5. Show connections between resources with arrows
-6. Use appropriate shapes: [(database)], {{decision}}, [process], ([service])
-
-Example format:
-```mermaid
-graph TD
-    subgraph VPC1["VPC 1 - 10.0.0.0/16"]
-        IGW1[Internet Gateway]
-        PUB1[Public Subnet<br/>10.0.1.0/24]
-        PRIV1[Private Subnet<br/>10.0.2.0/24]
-        FW1{{FortiGate Firewall}}
-        EC2_1([Ubuntu Server])
-    end
+def generate_mermaid_diagram(terraform_content, diagram_type):
+    """Use Bedrock to generate a Mermaid diagram from Terraform code."""
 
-    Internet((Internet)) --> IGW1
-    IGW1 --> PUB1
-    PUB1 --> FW1
-    FW1 --> PRIV1
-    PRIV1 --> EC2_1
-```
+    if len(terraform_content) < MIN_BEDROCK_CONTENT:
+        return generate_basic_diagram()
 
-Terraform Configuration:
-{terraform_content}
+    if diagram_type not in MERMAID_SYSTEM_PROMPTS:
+        diagram_type = 'architecture'
+    system_prompt = MERMAID_SYSTEM_PROMPTS[diagram_type]
 
-Generate ONLY the Mermaid diagram code (starting with ```mermaid and ending with ```). No other text."""
+    content_hash = hashlib.blake2b(terraform_content.encode('utf-8'), digest_size=16).hexdigest()
+    cache_key = f"{BEDROCK_MODEL_ID}#mermaid-{diagram_type}#{content_hash}"
+    cached = get_cached_response(cache_key)
+    if cached is not None:
+        return cached
 
     try:
-        response = bedrock_runtime.invoke_model(
-            modelId='us.anthropic.claude-sonnet-4-20250514-v1:0',
-            contentType='application/json',
-            accept='application/json',
-            body=json.dumps({
-                'anthropic_version': 'bedrock-2023-05-31',
-                'max_tokens': 2000,
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ]
-            })
+        diagram_text = converse_claude(
+            system_prompt,
+            f"Terraform Configuration:\n{terraform_content}\n\n"
+            "Generate ONLY the Mermaid diagram code (starting with ```mermaid and ending with ```). No other text.",
+            max_tokens=2000
         )
 
-        response_body = json.loads(response['body'].read())
-        diagram_text = response_body['content'][0]['text']
-
         # Extract just the mermaid code if wrapped
-        if '```mermaid' in diagram_text:
-            start = diagram_text.find('```mermaid')
-            end = diagram_text.find('```', start + 10)
-            if end != -1:
-                diagram_text = diagram_text[start:end + 3]
+        _, fence, rest = diagram_text.partition('```mermaid')
+        if fence:
+            code, closing, _ = rest.partition('```')
+            if closing:
+                diagram_text = fence + code + closing
 
+        put_cached_response(cache_key, diagram_text)
         return diagram_text
 
     except Exception as e:
@@ -207,81 +319,37 @@ Generate ONLY the Mermaid diagram code (starting with ```mermaid and ending with
 def generate_ascii_diagram(terraform_content, diagram_type):
     """Use Bedrock to generate an ASCII diagram from Terraform code."""
 
-    if diagram_type == 'network':
-        focus = "Focus on VPCs, subnets, route tables, internet gateways, and network connectivity."
-    elif diagram_type == 'security':
-        focus = "Focus on security groups, firewalls, and security boundaries."
-    elif diagram_type == 'compute':
-        focus = "Focus on EC2 instances and compute resources."
-    else:  # architecture (default)
-        focus = "Show the complete infrastructure including VPCs, subnets, EC2 instances, firewalls, and VPN connections."
-
-    prompt = f"""Analyze this Terraform configuration and create a simple ASCII diagram.
-{focus}
-
-Requirements:
-1. Use simple ASCII box characters: +, -, |, =
-2. Keep it clean and readable - fit within 80 characters width
-3. Use meaningful labels
-4. Show VPCs as large boxes containing their resources
-5. Show VPN tunnel connection between FortiGates with === or ~~~
-6. Use clear arrows for traffic flow: --> or <-->
-
-Example format:
-```
-                              INTERNET
-                                 |
-            +--------------------+--------------------+
-            |                                         |
-    +-------v--------+                       +--------v-------+
-    |    VPC 1       |                       |     VPC 2      |
-    | 10.0.0.0/16    |                       | 10.100.0.0/16  |
-    |                |                       |                |
-    | +------------+ |                       | +------------+ |
-    | | FortiGate1 |=========================| FortiGate2 | |
-    | | 3.x.x.x    | |     VPN Tunnel       | | 3.x.x.x    | |
-    | +-----+------+ |                       | +-----+------+ |
-    |       |        |                       |       |        |
-    | +-----v------+ |                       | +-----v------+ |
-    | | Ubuntu-1   | |                       | | Ubuntu-2   | |
-    | | 10.0.1.10  | |                       | | 10.100.1.10| |
-    | +------------+ |                       | +------------+ |
-    +----------------+                       +----------------+
-```
+    if len(terraform_content) < MIN_BEDROCK_CONTENT:
+        return generate_basic_ascii_diagram()
 
-Terraform Configuration:
-{terraform_content}
+    if diagram_type not in ASCII_SYSTEM_PROMPTS:
+        diagram_type = 'architecture'
+    system_prompt = ASCII_SYSTEM_PROMPTS[diagram_type]
 
-Generate ONLY the ASCII diagram inside a code block. No other text. Make it informative with real IP addresses if visible in the config."""
+    content_hash = hashlib.blake2b(terraform_content.encode('utf-8'), digest_size=16).hexdigest()
+    cache_key = f"{BEDROCK_MODEL_ID}#ascii-{diagram_type}#{content_hash}"
+    cached = get_cached_response(cache_key)
+    if cached is not None:
+        return cached
 
     try:
-        response = bedrock_runtime.invoke_model(
-            modelId='us.anthropic.claude-sonnet-4-20250514-v1:0',
-            contentType='application/json',
-            accept='application/json',
-            body=json.dumps({
-                'anthropic_version': 'bedrock-2023-05-31',
-                'max_tokens': 2000,
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ]
-            })
+        diagram_text = converse_claude(
+            system_prompt,
+            f"Terraform Configuration:\n{terraform_content}\n\n"
+            "Generate ONLY the ASCII diagram inside a code block. No other text. "
+            "Make it informative with real IP addresses if visible in the config.",
+            max_tokens=2000
         )
 
-        response_body = json.loads(response['body'].read())
-        diagram_text = response_body['content'][0]['text']
-
         # Clean up the response - extract just the diagram
-        if '```' in diagram_text:
-            start = diagram_text.find('```')
-            end = diagram_text.find('```', start + 3)
-            if end != -1:
-                # Get content between the backticks
-                diagram_text = diagram_text[start:end + 3]
-
+        _, fence, rest = diagram_text.partition('```')
+        if fence:
+            code, closing, _ = rest.partition('```')
+            if closing:
+                # Keep the fenced block including its backticks
+                diagram_text = fence + code + closing
+
+        put_cached_response(cache_key, diagram_text)
         return diagram_text
 
     except Exception as e:
@@ -289,6 +357,76 @@ Generate ONLY the ASCII diagram inside a code block. No other text. Make it info
         return generate_basic_ascii_diagram()
 
 
+def converse_claude(system_prompt, user_prompt, max_tokens):
+    """
+    Call Claude through the Converse API. In standard mode the system
+    prompt is marked as a cacheable prefix; in optimized mode the request
+    uses latency-optimized inference instead. Returns the response text.
+    """
+    request = {
+        'modelId': BEDROCK_MODEL_ID,
+        'messages': [
+            {
+                'role': 'user',
+                'content': [{'text': user_prompt}]
+            }
+        ],
+        'inferenceConfig': {'maxTokens': max_tokens}
+    }
+    if BEDROCK_LATENCY == 'optimized':
+        request['system'] = [{'text': system_prompt}]
+        request['performanceConfig'] = {'latency': 'optimized'}
+    else:
+        request['system'] = [
+            {'text': system_prompt},
+            {'cachePoint': {'type': 'default'}}
+        ]
+
+    response = bedrock_runtime.converse(**request)
+
+    usage = response.get('usage', {})
+    print(f"Bedrock usage: input={usage.get('inputTokens', 0)} "
+          f"cache_read={usage.get('cacheReadInputTokens', 0)} "
+          f"cache_write={usage.get('cacheWriteInputTokens', 0)}")
+
+    return response['output']['message']['content'][0]['text']
+
+
+def get_cached_response(cache_key):
+    """Look up a stored Bedrock response, or None on a miss or error."""
+    if not RESPONSE_CACHE_TABLE:
+        return None
+    try:
+        item = dynamodb_client.get_item(
+            TableName=RESPONSE_CACHE_TABLE,
+            Key={'cache_key': {'S': cache_key}}
+        ).get('Item')
+        # TTL deletion is lazy, so expired items can still be returned
+        if not item or int(item['expires_at']['N']) < time.time():
+            return None
+        return item['response']['S']
+    except Exception as e:
+        print(f"Response cache lookup failed: {e}")
+        return None
+
+
+def put_cached_response(cache_key, response_text):
+    """Store a Bedrock response for RESPONSE_CACHE_TTL seconds."""
+    if not RESPONSE_CACHE_TABLE:
+        return
+    try:
+        dynamodb_client.put_item(
+            TableName=RESPONSE_CACHE_TABLE,
+            Item={
+                'cache_key': {'S': cache_key},
+                'response': {'S': response_text},
+                'expires_at': {'N': str(int(time.time()) + RESPONSE_CACHE_TTL)}
+            }
+        )
+    except Exception as e:
+        print(f"Response cache write failed: {e}")
+
+
 def generate_basic_ascii_diagram():
     """Generate a basic fallback ASCII diagram."""
 
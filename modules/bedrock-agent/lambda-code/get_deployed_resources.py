@@ -7,8 +7,30 @@ Returns resource information suitable for display in chat.
 import boto3
 import json
 import os
+import time
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 
-ec2_client = boto3.client('ec2')
+# Pool sized well above the number of concurrent describe calls, adaptive
+# retries so bursts from the agent back off on EC2 API throttling instead
+# of failing, and keep-alive on warm containers
+BOTO_CONFIG = Config(
+    max_pool_connections=32,
+    retries={'mode': 'adaptive', 'max_attempts': 10},
+    tcp_keepalive=True
+)
+
+ec2_client = boto3.client('ec2', config=BOTO_CONFIG)
+
+# Largest page each describe call allows, so big accounts take few round trips
+PAGE_SIZE = 1000
+SECURITY_GROUP_PAGE_SIZE = 500
+
+# Unfiltered inventory reused across warm invocations for INVENTORY_TTL
+# seconds; deployments change on the order of minutes, chat bursts don't
+_INVENTORY_CACHE = {'ts': 0, 'resources': None}
+INVENTORY_TTL = int(os.environ.get('INVENTORY_TTL', '30'))
 
 
 def lambda_handler(event, context):
@@ -18,48 +40,13 @@ def lambda_handler(event, context):
     """
 
     # Get resource type filter from parameters
-    resource_filter = None
     if 'actionGroup' in event:
-        params = {}
-        if 'parameters' in event:
-            for param in event.get('parameters', []):
-                params[param['name']] = param['value']
-        if 'requestBody' in event and 'content' in event['requestBody']:
-            body = event['requestBody']['content'].get('application/json', {})
-            if 'properties' in body:
-                for prop in body['properties']:
-                    params[prop['name']] = prop['value']
-        resource_filter = params.get('resource_type')
+        resource_filter = get_agent_param(event, 'resource_type')
     else:
         resource_filter = event.get('resource_type')
 
     try:
-        # Query AWS directly for resources
-        resources = []
-
-        # Get VPCs
-        vpcs = get_vpcs()
-        resources.extend(vpcs)
-
-        # Get EC2 instances
-        instances = get_instances()
-        resources.extend(instances)
-
-        # Get subnets
-        subnets = get_subnets()
-        resources.extend(subnets)
-
-        # Get security groups
-        security_groups = get_security_groups()
-        resources.extend(security_groups)
-
-        # Get elastic IPs
-        eips = get_elastic_ips()
-        resources.extend(eips)
-
-        # Get internet gateways
-        igws = get_internet_gateways()
-        resources.extend(igws)
+        resources = get_inventory()
 
         if not resources:
             return format_response(event, {
@@ -68,10 +55,10 @@ def lambda_handler(event, context):
                 'resources': []
             }, 200)
 
-        # Filter if requested
+        # Filter if requested; the getters' type names are all lowercase
         if resource_filter:
-            resources = [r for r in resources
-                         if resource_filter.lower() in r.get('type', '').lower()]
+            wanted = resource_filter.lower()
+            resources = [r for r in resources if wanted in r['type']]
 
         # Group resources by type for better display
         grouped = group_resources(resources)
@@ -97,213 +84,271 @@ def lambda_handler(event, context):
         }, 500)
 
 
-def get_vpcs():
-    """Get VPCs with FortiGate or Demo tags."""
-    resources = []
-    try:
-        response = ec2_client.describe_vpcs(
-            Filters=[
-                {'Name': 'tag:Project', 'Values': ['FortiGate-VPN-Demo', 'fortigate-demo', '*fortigate*', '*demo*']}
-            ]
-        )
+def get_agent_param(event, name):
+    """
+    Find one parameter in a Bedrock Agent event without building the full
+    params dict. Request body properties take precedence over parameters.
+    """
+    body = event.get('requestBody', {}).get('content', {}).get('application/json', {})
+    for prop in reversed(body.get('properties', ())):
+        if prop['name'] == name:
+            return prop['value']
+    for param in reversed(event.get('parameters') or ()):
+        if param['name'] == name:
+            return param['value']
+    return None
 
-        # If no project tag, get all non-default VPCs
-        if not response.get('Vpcs'):
-            response = ec2_client.describe_vpcs(
-                Filters=[{'Name': 'isDefault', 'Values': ['false']}]
-            )
 
-        for vpc in response.get('Vpcs', []):
-            name = get_tag_value(vpc.get('Tags', []), 'Name') or vpc['VpcId']
-            resources.append({
-                'type': 'vpc',
-                'id': vpc['VpcId'],
-                'name': name,
-                'attributes': {
-                    'cidr_block': vpc.get('CidrBlock'),
-                    'state': vpc.get('State'),
-                    'is_default': vpc.get('IsDefault', False)
-                }
-            })
-    except Exception as e:
-        pass
+def get_inventory():
+    """Return all deployed resources, cached for INVENTORY_TTL seconds."""
+    if (_INVENTORY_CACHE['resources'] is not None
+            and time.monotonic() - _INVENTORY_CACHE['ts'] < INVENTORY_TTL):
+        return _INVENTORY_CACHE['resources']
+
+    _INVENTORY_CACHE['resources'] = None
+    resources, failed = get_all_resources()
+
+    # Only a complete, non-empty inventory is cached: a partial one would
+    # hide the failed lookups until the TTL ran out, and an empty one would
+    # delay a fresh deployment showing up
+    if resources and not failed:
+        _INVENTORY_CACHE['resources'] = resources
+        _INVENTORY_CACHE['ts'] = time.monotonic()
     return resources
 
 
-def get_instances():
-    """Get EC2 instances."""
-    resources = []
-    try:
-        response = ec2_client.describe_instances(
-            Filters=[
-                {'Name': 'instance-state-name', 'Values': ['running', 'stopped', 'pending']}
-            ]
-        )
+def get_all_resources():
+    """
+    Query AWS directly for every resource type.
+    Returns (resources, failed), where failed names the lookups that raised.
+    """
+    failed = []
 
-        for reservation in response.get('Reservations', []):
-            for instance in reservation.get('Instances', []):
-                name = get_tag_value(instance.get('Tags', []), 'Name') or instance['InstanceId']
-                instance_type = instance.get('InstanceType', '')
-
-                # Determine if it's a FortiGate or Ubuntu
-                role = 'unknown'
-                if 'fortigate' in name.lower() or 'fortios' in instance_type.lower():
-                    role = 'FortiGate Firewall'
-                elif 'ubuntu' in name.lower():
-                    role = 'Ubuntu Server'
-
-                resources.append({
-                    'type': 'instance',
-                    'id': instance['InstanceId'],
-                    'name': name,
-                    'role': role,
-                    'attributes': {
-                        'instance_type': instance_type,
-                        'state': instance['State']['Name'],
-                        'public_ip': instance.get('PublicIpAddress', 'None'),
-                        'private_ip': instance.get('PrivateIpAddress'),
-                        'availability_zone': instance['Placement']['AvailabilityZone'],
-                        'vpc_id': instance.get('VpcId'),
-                        'subnet_id': instance.get('SubnetId'),
-                        'launch_time': instance.get('LaunchTime', '').isoformat() if instance.get('LaunchTime') else None
-                    }
-                })
+    # Look up VPC IDs once for the getters that scope by VPC
+    try:
+        vpc_ids = get_non_default_vpc_ids()
     except Exception as e:
-        pass
-    return resources
+        print(f"get_non_default_vpc_ids failed: {e}")
+        failed.append('get_non_default_vpc_ids')
+        vpc_ids = set()
+
+    # The getters are independent, so run them concurrently and collect
+    # the results in this order
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        futures = [
+            ('get_vpcs', executor.submit(get_vpcs)),
+            ('get_instances', executor.submit(get_instances)),
+            ('get_subnets', executor.submit(get_subnets, vpc_ids)),
+            ('get_security_groups', executor.submit(get_security_groups, vpc_ids)),
+            ('get_elastic_ips', executor.submit(get_elastic_ips)),
+            ('get_internet_gateways', executor.submit(get_internet_gateways, vpc_ids))
+        ]
+
+    resources = []
+    for name, future in futures:
+        try:
+            resources.extend(future.result())
+        except Exception as e:
+            print(f"{name} failed: {e}")
+            failed.append(name)
+    return resources, failed
+
+
+def get_non_default_vpc_ids():
+    """Return the IDs of all non-default VPCs."""
+    vpc_ids = set()
+    pages = ec2_client.get_paginator('describe_vpcs').paginate(
+        Filters=[{'Name': 'isDefault', 'Values': ['false']}],
+        PaginationConfig={'PageSize': PAGE_SIZE}
+    )
+    vpc_ids.update(pages.search('Vpcs[].VpcId'))
+    return vpc_ids
 
 
-def get_subnets():
-    """Get subnets from non-default VPCs."""
+def get_vpcs():
+    """Get VPCs with FortiGate or Demo tags."""
     resources = []
-    try:
-        # First get non-default VPCs
-        vpc_response = ec2_client.describe_vpcs(
-            Filters=[{'Name': 'isDefault', 'Values': ['false']}]
-        )
-        vpc_ids = [vpc['VpcId'] for vpc in vpc_response.get('Vpcs', [])]
-
-        if vpc_ids:
-            response = ec2_client.describe_subnets(
-                Filters=[{'Name': 'vpc-id', 'Values': vpc_ids}]
-            )
-
-            for subnet in response.get('Subnets', []):
-                name = get_tag_value(subnet.get('Tags', []), 'Name') or subnet['SubnetId']
-                resources.append({
-                    'type': 'subnet',
-                    'id': subnet['SubnetId'],
-                    'name': name,
-                    'attributes': {
-                        'cidr_block': subnet.get('CidrBlock'),
-                        'availability_zone': subnet.get('AvailabilityZone'),
-                        'vpc_id': subnet.get('VpcId'),
-                        'available_ips': subnet.get('AvailableIpAddressCount')
-                    }
-                })
-    except Exception as e:
-        pass
+    paginator = ec2_client.get_paginator('describe_vpcs')
+    vpcs = list(paginator.paginate(
+        Filters=[
+            {'Name': 'tag:Project', 'Values': ['FortiGate-VPN-Demo', 'fortigate-demo', '*fortigate*', '*demo*']}
+        ],
+        PaginationConfig={'PageSize': PAGE_SIZE}
+    ).search('Vpcs[]'))
+
+    # If no project tag, get all non-default VPCs
+    if not vpcs:
+        vpcs = paginator.paginate(
+            Filters=[{'Name': 'isDefault', 'Values': ['false']}],
+            PaginationConfig={'PageSize': PAGE_SIZE}
+        ).search('Vpcs[]')
+
+    for vpc in vpcs:
+        tags = {tag['Key']: tag['Value'] for tag in vpc.get('Tags') or ()}
+        name = tags.get('Name') or vpc['VpcId']
+        resources.append({
+            'type': 'vpc',
+            'id': vpc['VpcId'],
+            'name': name,
+            'attributes': {
+                'cidr_block': vpc.get('CidrBlock'),
+                'state': vpc.get('State'),
+                'is_default': vpc.get('IsDefault', False)
+            }
+        })
     return resources
 
 
-def get_security_groups():
-    """Get security groups from non-default VPCs."""
+def get_instances():
+    """Get EC2 instances."""
     resources = []
-    try:
-        # First get non-default VPCs
-        vpc_response = ec2_client.describe_vpcs(
-            Filters=[{'Name': 'isDefault', 'Values': ['false']}]
-        )
-        vpc_ids = [vpc['VpcId'] for vpc in vpc_response.get('Vpcs', [])]
-
-        if vpc_ids:
-            response = ec2_client.describe_security_groups(
-                Filters=[{'Name': 'vpc-id', 'Values': vpc_ids}]
-            )
-
-            for sg in response.get('SecurityGroups', []):
-                if sg.get('GroupName') == 'default':
-                    continue
-                resources.append({
-                    'type': 'security_group',
-                    'id': sg['GroupId'],
-                    'name': sg.get('GroupName'),
-                    'attributes': {
-                        'description': sg.get('Description'),
-                        'vpc_id': sg.get('VpcId'),
-                        'ingress_rules': len(sg.get('IpPermissions', [])),
-                        'egress_rules': len(sg.get('IpPermissionsEgress', []))
-                    }
-                })
-    except Exception as e:
-        pass
+    pages = ec2_client.get_paginator('describe_instances').paginate(
+        Filters=[
+            {'Name': 'instance-state-name', 'Values': ['running', 'stopped', 'pending']}
+        ],
+        PaginationConfig={'PageSize': PAGE_SIZE}
+    )
+
+    for instance in pages.search('Reservations[].Instances[]'):
+        tags = {tag['Key']: tag['Value'] for tag in instance.get('Tags') or ()}
+        name = tags.get('Name') or instance['InstanceId']
+        instance_type = instance.get('InstanceType', '')
+
+        # Determine if it's a FortiGate or Ubuntu
+        name_lower = name.lower()
+        role = 'unknown'
+        if 'fortigate' in name_lower or 'fortios' in instance_type.lower():
+            role = 'FortiGate Firewall'
+        elif 'ubuntu' in name_lower:
+            role = 'Ubuntu Server'
+
+        resources.append({
+            'type': 'instance',
+            'id': instance['InstanceId'],
+            'name': name,
+            'role': role,
+            'attributes': {
+                'instance_type': instance_type,
+                'state': instance['State']['Name'],
+                'public_ip': instance.get('PublicIpAddress', 'None'),
+                'private_ip': instance.get('PrivateIpAddress'),
+                'availability_zone': instance['Placement']['AvailabilityZone'],
+                'vpc_id': instance.get('VpcId'),
+                'subnet_id': instance.get('SubnetId'),
+                'launch_time': instance.get('LaunchTime', '').isoformat() if instance.get('LaunchTime') else None
+            }
+        })
     return resources
 
 
-def get_elastic_ips():
-    """Get Elastic IPs."""
+def get_subnets(vpc_ids):
+    """Get subnets from the given non-default VPCs."""
     resources = []
-    try:
-        response = ec2_client.describe_addresses()
+    if vpc_ids:
+        pages = ec2_client.get_paginator('describe_subnets').paginate(
+            Filters=[{'Name': 'vpc-id', 'Values': sorted(vpc_ids)}],
+            PaginationConfig={'PageSize': PAGE_SIZE}
+        )
 
-        for eip in response.get('Addresses', []):
-            name = get_tag_value(eip.get('Tags', []), 'Name') or eip.get('PublicIp')
+        for subnet in pages.search('Subnets[]'):
+            tags = {tag['Key']: tag['Value'] for tag in subnet.get('Tags') or ()}
+            name = tags.get('Name') or subnet['SubnetId']
             resources.append({
-                'type': 'elastic_ip',
-                'id': eip.get('AllocationId'),
+                'type': 'subnet',
+                'id': subnet['SubnetId'],
                 'name': name,
                 'attributes': {
-                    'public_ip': eip.get('PublicIp'),
-                    'private_ip': eip.get('PrivateIpAddress'),
-                    'instance_id': eip.get('InstanceId', 'unattached'),
-                    'network_interface': eip.get('NetworkInterfaceId')
+                    'cidr_block': subnet.get('CidrBlock'),
+                    'availability_zone': subnet.get('AvailabilityZone'),
+                    'vpc_id': subnet.get('VpcId'),
+                    'available_ips': subnet.get('AvailableIpAddressCount')
                 }
             })
-    except Exception as e:
-        pass
     return resources
 
 
-def get_internet_gateways():
-    """Get Internet Gateways."""
+def get_security_groups(vpc_ids):
+    """Get security groups from the given non-default VPCs."""
     resources = []
-    try:
-        response = ec2_client.describe_internet_gateways(
-            Filters=[{'Name': 'attachment.state', 'Values': ['available']}]
+    if vpc_ids:
+        pages = ec2_client.get_paginator('describe_security_groups').paginate(
+            Filters=[{'Name': 'vpc-id', 'Values': sorted(vpc_ids)}],
+            PaginationConfig={'PageSize': SECURITY_GROUP_PAGE_SIZE}
         )
 
-        for igw in response.get('InternetGateways', []):
-            name = get_tag_value(igw.get('Tags', []), 'Name') or igw['InternetGatewayId']
-            vpc_id = None
-            for attachment in igw.get('Attachments', []):
-                vpc_id = attachment.get('VpcId')
-                break
-
-            # Skip default VPC gateways
-            if vpc_id:
-                vpc_response = ec2_client.describe_vpcs(VpcIds=[vpc_id])
-                if vpc_response.get('Vpcs') and vpc_response['Vpcs'][0].get('IsDefault'):
-                    continue
-
+        for sg in pages.search('SecurityGroups[]'):
+            if sg.get('GroupName') == 'default':
+                continue
             resources.append({
-                'type': 'internet_gateway',
-                'id': igw['InternetGatewayId'],
-                'name': name,
+                'type': 'security_group',
+                'id': sg['GroupId'],
+                'name': sg.get('GroupName'),
                 'attributes': {
-                    'vpc_id': vpc_id
+                    'description': sg.get('Description'),
+                    'vpc_id': sg.get('VpcId'),
+                    'ingress_rules': len(sg.get('IpPermissions', [])),
+                    'egress_rules': len(sg.get('IpPermissionsEgress', []))
                 }
             })
-    except Exception as e:
-        pass
     return resources
 
 
-def get_tag_value(tags, key):
-    """Extract tag value by key."""
-    for tag in tags:
-        if tag.get('Key') == key:
-            return tag.get('Value')
-    return None
+def get_elastic_ips():
+    """Get Elastic IPs."""
+    resources = []
+    # Not paginated: DescribeAddresses always returns every address
+    response = ec2_client.describe_addresses()
+
+    for eip in response.get('Addresses', []):
+        tags = {tag['Key']: tag['Value'] for tag in eip.get('Tags') or ()}
+        name = tags.get('Name') or eip.get('PublicIp')
+        resources.append({
+            'type': 'elastic_ip',
+            'id': eip.get('AllocationId'),
+            'name': name,
+            'attributes': {
+                'public_ip': eip.get('PublicIp'),
+                'private_ip': eip.get('PrivateIpAddress'),
+                'instance_id': eip.get('InstanceId', 'unattached'),
+                'network_interface': eip.get('NetworkInterfaceId')
+            }
+        })
+    return resources
+
+
+def get_internet_gateways(vpc_ids):
+    """Get Internet Gateways attached to the given non-default VPCs."""
+    resources = []
+    if not vpc_ids:
+        return resources
+
+    # Filtering on the attached VPC server-side leaves out default VPC
+    # gateways without checking each attachment here
+    pages = ec2_client.get_paginator('describe_internet_gateways').paginate(
+        Filters=[
+            {'Name': 'attachment.state', 'Values': ['available']},
+            {'Name': 'attachment.vpc-id', 'Values': sorted(vpc_ids)}
+        ],
+        PaginationConfig={'PageSize': PAGE_SIZE}
+    )
+
+    for igw in pages.search('InternetGateways[]'):
+        tags = {tag['Key']: tag['Value'] for tag in igw.get('Tags') or ()}
+        name = tags.get('Name') or igw['InternetGatewayId']
+        vpc_id = None
+        for attachment in igw.get('Attachments', []):
+            vpc_id = attachment.get('VpcId')
+            break
+
+        resources.append({
+            'type': 'internet_gateway',
+            'id': igw['InternetGatewayId'],
+            'name': name,
+            'attributes': {
+                'vpc_id': vpc_id
+            }
+        })
+    return resources
 
 
 def group_resources(resources):
@@ -321,42 +366,51 @@ def group_resources(resources):
     return grouped
 
 
+# Key info line per resource type, called with (attributes, resource)
+KEY_INFO_FORMATTERS = {
+    'instance': lambda attrs, resource: (
+        f"{resource.get('role', '')} | Public: {attrs.get('public_ip', 'None')} | "
+        f"Private: {attrs.get('private_ip', '')} | {attrs.get('state', 'unknown')}"
+    ),
+    'vpc': lambda attrs, resource: f"{attrs.get('cidr_block', '')} | {attrs.get('state', '')}",
+    'subnet': lambda attrs, resource: f"{attrs.get('cidr_block', '')} | {attrs.get('availability_zone', '')}",
+    'security_group': lambda attrs, resource: (
+        f"{attrs.get('ingress_rules', 0)} ingress, {attrs.get('egress_rules', 0)} egress"
+    ),
+    'elastic_ip': lambda attrs, resource: (
+        f"{attrs.get('public_ip', '')} -> {attrs.get('instance_id', 'unattached')}"
+    ),
+    'internet_gateway': lambda attrs, resource: f"Attached to {attrs.get('vpc_id', 'none')}"
+}
+
+
 def get_key_info(resource):
     """Extract the most important info for each resource type."""
-    attrs = resource.get('attributes', {})
-    resource_type = resource['type']
-
-    if resource_type == 'instance':
-        role = resource.get('role', '')
-        public_ip = attrs.get('public_ip', 'None')
-        private_ip = attrs.get('private_ip', '')
-        state = attrs.get('state', 'unknown')
-        return f"{role} | Public: {public_ip} | Private: {private_ip} | {state}"
-    elif resource_type == 'vpc':
-        return f"{attrs.get('cidr_block', '')} | {attrs.get('state', '')}"
-    elif resource_type == 'subnet':
-        return f"{attrs.get('cidr_block', '')} | {attrs.get('availability_zone', '')}"
-    elif resource_type == 'security_group':
-        return f"{attrs.get('ingress_rules', 0)} ingress, {attrs.get('egress_rules', 0)} egress"
-    elif resource_type == 'elastic_ip':
-        return f"{attrs.get('public_ip', '')} -> {attrs.get('instance_id', 'unattached')}"
-    elif resource_type == 'internet_gateway':
-        return f"Attached to {attrs.get('vpc_id', 'none')}"
-    else:
+    formatter = KEY_INFO_FORMATTERS.get(resource['type'])
+    if formatter is None:
         return resource['id']
+    return formatter(resource.get('attributes', {}), resource)
 
 
 def create_summary(resources):
     """Create a human-readable summary of deployed resources."""
+    # Count types and pick out the key resources in a single pass
     type_counts = {}
+    instances = []
+    vpcs = []
+    eips = []
+    running = 0
     for r in resources:
         t = r['type']
         type_counts[t] = type_counts.get(t, 0) + 1
-
-    # Find key resources
-    instances = [r for r in resources if r['type'] == 'instance']
-    vpcs = [r for r in resources if r['type'] == 'vpc']
-    eips = [r for r in resources if r['type'] == 'elastic_ip']
+        if t == 'instance':
+            instances.append(r)
+            if r['attributes'].get('state') == 'running':
+                running += 1
+        elif t == 'vpc':
+            vpcs.append(r)
+        elif t == 'elastic_ip':
+            eips.append(r)
 
     summary_parts = []
 
@@ -365,12 +419,12 @@ def create_summary(resources):
         summary_parts.append(f"**VPCs ({len(vpcs)})**: {', '.join(vpc_info)}")
 
     if instances:
-        running = sum(1 for i in instances if i['attributes'].get('state') == 'running')
         summary_parts.append(f"**Instances ({len(instances)})**: {running} running")
 
         # List instances with details
         instance_details = []
-        for inst in sorted(instances, key=lambda x: x['name']):
+        instances.sort(key=itemgetter('name'))
+        for inst in instances:
             name = inst['name']
             role = inst.get('role', '')
             public_ip = inst['attributes'].get('public_ip', 'None')
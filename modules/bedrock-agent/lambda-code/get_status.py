@@ -6,9 +6,94 @@ Gets status of Terraform operations and infrastructure state.
 import boto3
 import json
 import os
+import time
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Adaptive retries so bursts from the agent back off on throttling
+# instead of failing, and keep-alive on warm containers
+BOTO_CONFIG = Config(
+    retries={'mode': 'adaptive', 'max_attempts': 10},
+    tcp_keepalive=True
+)
+
+# Attributes copied from each state instance when present
+STATE_ATTRIBUTES = ('id', 'arn', 'public_ip', 'private_ip')
+
+# Parsed state/outputs documents by (bucket, key), with the ETag they were
+# read at; warm invocations revalidate with a conditional GET instead of
+# downloading and parsing an unchanged document again
+_JSON_CACHE = OrderedDict()
+JSON_CACHE_SIZE = 4
+
+# CodeBuild responses reused for STATUS_CACHE_TTL seconds, so a dashboard
+# polling every few seconds doesn't run into CodeBuild's API rate limits
+_CODEBUILD_CACHE = {}
+STATUS_CACHE_TTL = float(os.environ.get('STATUS_CACHE_TTL', '2'))
+CODEBUILD_CACHE_SIZE = 64
+
+# Clients are created on first use: a single check_type needs only one
+# of them, so a cold start shouldn't pay to load both service models
+_CLIENTS = {}
+
+
+def get_client(service):
+    """Return the shared client for a service, creating it on first use."""
+    client = _CLIENTS.get(service)
+    if client is None:
+        client = _CLIENTS[service] = boto3.client(service, config=BOTO_CONFIG)
+    return client
+
+
+def cached_codebuild_call(cache_key, call):
+    """Return call(), reusing its response for STATUS_CACHE_TTL seconds."""
+    now = time.monotonic()
+    cached = _CODEBUILD_CACHE.get(cache_key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    response = call()
+
+    # Drop expired entries so polling many build ids doesn't grow the cache
+    if len(_CODEBUILD_CACHE) >= CODEBUILD_CACHE_SIZE:
+        for key in [k for k, (expires_at, _) in _CODEBUILD_CACHE.items() if expires_at <= now]:
+            del _CODEBUILD_CACHE[key]
+
+    _CODEBUILD_CACHE[cache_key] = (now + STATUS_CACHE_TTL, response)
+    return response
+
+
+def read_s3_json(bucket, key):
+    """Return a JSON document from S3, reusing the parsed copy if unchanged."""
+    s3_client = get_client('s3')
+    cache_key = (bucket, key)
+    cached = _JSON_CACHE.get(cache_key)
+
+    params = {'Bucket': bucket, 'Key': key}
+    if cached:
+        params['IfNoneMatch'] = cached[0]
 
-codebuild_client = boto3.client('codebuild')
-s3_client = boto3.client('s3')
+    try:
+        response = s3_client.get_object(**params)
+    except ClientError as e:
+        if cached and e.response['ResponseMetadata'].get('HTTPStatusCode') == 304:
+            _JSON_CACHE.move_to_end(cache_key)
+            return cached[1]
+        raise
+
+    # json.loads takes the UTF-8 bytes directly, so the document never
+    # exists as a second, decoded copy in memory
+    document = json.loads(response['Body'].read())
+
+    _JSON_CACHE[cache_key] = (response['ETag'], document)
+    _JSON_CACHE.move_to_end(cache_key)
+    if len(_JSON_CACHE) > JSON_CACHE_SIZE:
+        _JSON_CACHE.popitem(last=False)
+
+    return document
 
 
 def lambda_handler(event, context):
@@ -24,15 +109,7 @@ def lambda_handler(event, context):
 
     # Handle Bedrock Agent event format
     if 'actionGroup' in event:
-        params = {}
-        if 'parameters' in event:
-            for param in event.get('parameters', []):
-                params[param['name']] = param['value']
-        if 'requestBody' in event and 'content' in event['requestBody']:
-            body = event['requestBody']['content'].get('application/json', {})
-            if 'properties' in body:
-                for prop in body['properties']:
-                    params[prop['name']] = prop['value']
+        params = parse_agent_params(event)
 
         build_id = params.get('build_id')
         check_type = params.get('check_type', 'all')
@@ -45,7 +122,7 @@ def lambda_handler(event, context):
 
     result = {
         'check_type': check_type,
-        'timestamp': __import__('datetime').datetime.now().isoformat()
+        'timestamp': datetime.now().isoformat()
     }
 
     try:
@@ -55,10 +132,21 @@ def lambda_handler(event, context):
         if check_type in ['build_status', 'all'] and not build_id and codebuild_project:
             result['recent_builds'] = get_recent_builds(codebuild_project)
 
-        if check_type in ['infrastructure_state', 'all'] and state_bucket:
+        if check_type == 'all' and state_bucket:
+            # State and outputs are separate objects; read them side by side.
+            # The client is created up front since client creation on the
+            # default session isn't thread-safe
+            get_client('s3')
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                state_future = executor.submit(get_infrastructure_state, state_bucket)
+                outputs_future = executor.submit(get_terraform_outputs, state_bucket)
+            result['infrastructure'] = state_future.result()
+            result['outputs'] = outputs_future.result()
+
+        if check_type == 'infrastructure_state' and state_bucket:
             result['infrastructure'] = get_infrastructure_state(state_bucket)
 
-        if check_type in ['outputs', 'all'] and state_bucket:
+        if check_type == 'outputs' and state_bucket:
             result['outputs'] = get_terraform_outputs(state_bucket)
 
         # Determine overall status
@@ -78,10 +166,22 @@ def lambda_handler(event, context):
         }, 500)
 
 
+def parse_agent_params(event):
+    """Collect a Bedrock Agent event's parameters and body properties."""
+    body = event.get('requestBody', {}).get('content', {}).get('application/json', {})
+    params = {param['name']: param['value'] for param in event.get('parameters', [])}
+    params.update({prop['name']: prop['value'] for prop in body.get('properties', [])})
+    return params
+
+
 def get_build_status(build_id):
     """Get status of a specific CodeBuild execution."""
+    codebuild_client = get_client('codebuild')
     try:
-        response = codebuild_client.batch_get_builds(ids=[build_id])
+        response = cached_codebuild_call(
+            ('batch_get_builds', build_id),
+            lambda: codebuild_client.batch_get_builds(ids=[build_id])
+        )
 
         if not response['builds']:
             return {'error': 'Build not found', 'build_id': build_id}
@@ -114,10 +214,14 @@ def get_build_status(build_id):
 
 def get_recent_builds(project_name, limit=5):
     """Get recent builds for a CodeBuild project."""
+    codebuild_client = get_client('codebuild')
     try:
-        response = codebuild_client.list_builds_for_project(
-            projectName=project_name,
-            sortOrder='DESCENDING'
+        response = cached_codebuild_call(
+            ('list_builds_for_project', project_name),
+            lambda: codebuild_client.list_builds_for_project(
+                projectName=project_name,
+                sortOrder='DESCENDING'
+            )
         )
 
         build_ids = response.get('ids', [])[:limit]
@@ -125,7 +229,10 @@ def get_recent_builds(project_name, limit=5):
         if not build_ids:
             return {'message': 'No builds found', 'project': project_name}
 
-        builds_response = codebuild_client.batch_get_builds(ids=build_ids)
+        builds_response = cached_codebuild_call(
+            ('batch_get_builds',) + tuple(build_ids),
+            lambda: codebuild_client.batch_get_builds(ids=build_ids)
+        )
 
         builds = []
         for build in builds_response.get('builds', []):
@@ -155,39 +262,25 @@ def get_recent_builds(project_name, limit=5):
 
 def get_infrastructure_state(bucket):
     """Get current Terraform state summary."""
+    s3_client = get_client('s3')
     try:
-        response = s3_client.get_object(
-            Bucket=bucket,
-            Key='terraform/terraform.tfstate'
-        )
-        state = json.loads(response['Body'].read().decode('utf-8'))
-
-        # Extract resource summary
-        resources = []
-        for resource in state.get('resources', []):
-            instances = resource.get('instances', [])
-            for instance in instances:
-                attributes = instance.get('attributes', {})
-
-                resource_info = {
-                    'type': resource.get('type'),
-                    'name': resource.get('name'),
-                    'module': resource.get('module', 'root'),
-                    'provider': resource.get('provider'),
-                    'mode': resource.get('mode', 'managed')
-                }
-
-                # Add useful attributes based on resource type
-                if 'id' in attributes:
-                    resource_info['id'] = attributes['id']
-                if 'arn' in attributes:
-                    resource_info['arn'] = attributes['arn']
-                if 'public_ip' in attributes:
-                    resource_info['public_ip'] = attributes['public_ip']
-                if 'private_ip' in attributes:
-                    resource_info['private_ip'] = attributes['private_ip']
-
-                resources.append(resource_info)
+        state = read_s3_json(bucket, 'terraform/terraform.tfstate')
+
+        # Extract resource summary, one entry per instance with the useful
+        # attributes it has (in STATE_ATTRIBUTES order)
+        resources = [
+            {
+                'type': resource.get('type'),
+                'name': resource.get('name'),
+                'module': resource.get('module', 'root'),
+                'provider': resource.get('provider'),
+                'mode': resource.get('mode', 'managed'),
+                **{key: attributes[key] for key in STATE_ATTRIBUTES if key in attributes}
+            }
+            for resource in state.get('resources', [])
+            for instance in resource.get('instances', [])
+            for attributes in (instance.get('attributes', {}),)
+        ]
 
         return {
             'status': 'DEPLOYED',
@@ -212,12 +305,9 @@ def get_infrastructure_state(bucket):
 
 def get_terraform_outputs(bucket):
     """Get Terraform outputs from state."""
+    s3_client = get_client('s3')
     try:
-        response = s3_client.get_object(
-            Bucket=bucket,
-            Key='terraform/outputs.json'
-        )
-        outputs = json.loads(response['Body'].read().decode('utf-8'))
+        outputs = read_s3_json(bucket, 'terraform/outputs.json')
 
         # Format outputs for display
         formatted_outputs = {}
@@ -251,6 +341,9 @@ def get_terraform_outputs(bucket):
 
 def format_response(event, body, status_code):
     """Format response for Bedrock Agent or direct invocation."""
+    # Compact separators: the body is embedded as a string in the agent's
+    # response, so every byte here is serialized (and escaped) twice
+    payload = json.dumps(body, separators=(',', ':'))
 
     if 'actionGroup' in event:
         return {
@@ -262,7 +355,7 @@ def format_response(event, body, status_code):
                 'httpStatusCode': status_code,
                 'responseBody': {
                     'application/json': {
-                        'body': json.dumps(body)
+                        'body': payload
                     }
                 }
             }
@@ -270,5 +363,5 @@ def format_response(event, body, status_code):
     else:
         return {
             'statusCode': status_code,
-            'body': json.dumps(body)
+            'body': payload
         }
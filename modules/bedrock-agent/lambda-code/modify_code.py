@@ -7,8 +7,21 @@ import boto3
 import json
 import os
 from datetime import datetime
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 
-s3_client = boto3.client('s3')
+# Shared client config: pooled connections for parallel S3 calls, adaptive
+# retries for throttling, and keep-alive on warm containers
+BOTO_CONFIG = Config(
+    max_pool_connections=32,
+    retries={'mode': 'adaptive', 'max_attempts': 5},
+    tcp_keepalive=True
+)
+
+S3_COPY_WORKERS = 16
+TERRAFORM_EXTENSIONS = ('.tf', '.tpl', '.tfvars')
+
+s3_client = boto3.client('s3', config=BOTO_CONFIG)
 
 
 def lambda_handler(event, context):
@@ -35,12 +48,7 @@ def lambda_handler(event, context):
 
     # Handle Bedrock Agent event format
     if 'actionGroup' in event:
-        params = {}
-        if 'requestBody' in event and 'content' in event['requestBody']:
-            body = event['requestBody']['content'].get('application/json', {})
-            if 'properties' in body:
-                for prop in body['properties']:
-                    params[prop['name']] = prop['value']
+        params = parse_agent_params(event)
 
         modification_type = params.get('modification_type', 'update_resource')
         description = params.get('description', '')
@@ -81,6 +89,12 @@ def lambda_handler(event, context):
     backup_location = None
     previews = []
 
+    # Working copy of each touched file: read once, edited in memory by
+    # every change that targets it, written back once at the end
+    originals = {}
+    working = {}
+    modified_files = set()
+
     try:
         # Create backup before making changes (unless dry_run)
         if not dry_run:
@@ -96,9 +110,11 @@ def lambda_handler(event, context):
             if not file_path:
                 continue
 
-            # Read current file
+            # Read current file, or the copy earlier changes already edited
             s3_key = f"{terraform_prefix}{file_path}"
-            current_content = read_file(terraform_bucket, s3_key)
+            if s3_key not in working:
+                originals[s3_key] = working[s3_key] = read_file(terraform_bucket, s3_key)
+            current_content = working[s3_key]
 
             # Apply the change
             new_content, change_details = apply_change(
@@ -122,11 +138,16 @@ def lambda_handler(event, context):
                         'file': file_path,
                         'preview': preview
                     })
-                else:
-                    # Write changes
-                    write_file(terraform_bucket, s3_key, new_content, modification_type)
 
+                working[s3_key] = new_content
                 changes_made.append(change_record)
+                modified_files.add(file_path)
+
+        # Write changes, one PUT per modified file
+        if not dry_run:
+            for s3_key, new_content in working.items():
+                if new_content != originals[s3_key]:
+                    write_file(terraform_bucket, s3_key, new_content, modification_type)
 
         # Prepare result
         result = {
@@ -135,7 +156,7 @@ def lambda_handler(event, context):
             'modification_type': modification_type,
             'description': description,
             'changes_made': changes_made,
-            'total_files_modified': len(set(c['file'] for c in changes_made)),
+            'total_files_modified': len(modified_files),
             'backup_location': backup_location
         }
 
@@ -160,6 +181,14 @@ def lambda_handler(event, context):
         }, 500)
 
 
+def parse_agent_params(event):
+    """Collect a Bedrock Agent event's parameters and body properties."""
+    body = event.get('requestBody', {}).get('content', {}).get('application/json', {})
+    params = {param['name']: param['value'] for param in event.get('parameters', [])}
+    params.update({prop['name']: prop['value'] for prop in body.get('properties', [])})
+    return params
+
+
 def read_file(bucket, key):
     """Read file content from S3."""
     try:
@@ -184,58 +213,65 @@ def write_file(bucket, key, content, modification_type):
     )
 
 
-def apply_change(content, action, anchor, new_content, old_content):
-    """Apply a single change to file content."""
-    details = ""
-
-    if action == 'append':
-        # Add to end of file
-        if content and not content.endswith('\n'):
-            content += '\n'
-        result = content + new_content
-        details = f"Appended {len(new_content)} characters to end of file"
-
-    elif action == 'insert_after':
-        # Insert after anchor line
-        if anchor in content:
-            result = content.replace(anchor, anchor + '\n' + new_content)
-            details = f"Inserted content after '{anchor[:50]}...'"
-        else:
-            result = content
-            details = f"Anchor not found: '{anchor[:50]}...'"
-
-    elif action == 'insert_before':
-        # Insert before anchor line
-        if anchor in content:
-            result = content.replace(anchor, new_content + '\n' + anchor)
-            details = f"Inserted content before '{anchor[:50]}...'"
-        else:
-            result = content
-            details = f"Anchor not found: '{anchor[:50]}...'"
-
-    elif action == 'replace':
-        # Replace old_content with new_content
-        if old_content and old_content in content:
-            result = content.replace(old_content, new_content)
-            details = f"Replaced content ({len(old_content)} chars -> {len(new_content)} chars)"
-        else:
-            result = content
-            details = "Content to replace not found"
-
-    elif action == 'delete':
-        # Delete the anchor content
-        if anchor in content:
-            result = content.replace(anchor, '')
-            details = "Deleted content block"
-        else:
-            result = content
-            details = "Content to delete not found"
+def append_content(content, anchor, new_content, old_content):
+    """Add new_content to the end of the file."""
+    if content and not content.endswith('\n'):
+        content += '\n'
+    return content + new_content, f"Appended {len(new_content)} characters to end of file"
 
-    else:
-        result = content
-        details = f"Unknown action: {action}"
 
-    return result, details
+def insert_after_anchor(content, anchor, new_content, old_content):
+    """Insert new_content after the first occurrence of the anchor."""
+    index = content.find(anchor)
+    if index == -1:
+        return content, f"Anchor not found: '{anchor[:50]}...'"
+    split_at = index + len(anchor)
+    result = content[:split_at] + '\n' + new_content + content[split_at:]
+    return result, f"Inserted content after '{anchor[:50]}...'"
+
+
+def insert_before_anchor(content, anchor, new_content, old_content):
+    """Insert new_content before the first occurrence of the anchor."""
+    index = content.find(anchor)
+    if index == -1:
+        return content, f"Anchor not found: '{anchor[:50]}...'"
+    result = content[:index] + new_content + '\n' + content[index:]
+    return result, f"Inserted content before '{anchor[:50]}...'"
+
+
+def replace_content(content, anchor, new_content, old_content):
+    """Replace the first occurrence of old_content with new_content."""
+    index = content.find(old_content) if old_content else -1
+    if index == -1:
+        return content, "Content to replace not found"
+    result = content[:index] + new_content + content[index + len(old_content):]
+    return result, f"Replaced content ({len(old_content)} chars -> {len(new_content)} chars)"
+
+
+def delete_anchor(content, anchor, new_content, old_content):
+    """Delete the first occurrence of the anchor content."""
+    index = content.find(anchor)
+    if index == -1:
+        return content, "Content to delete not found"
+    return content[:index] + content[index + len(anchor):], "Deleted content block"
+
+
+# Handler for each code_changes action
+CHANGE_ACTIONS = {
+    'append': append_content,
+    'insert_after': insert_after_anchor,
+    'insert_before': insert_before_anchor,
+    'replace': replace_content,
+    'delete': delete_anchor
+}
+
+
+def apply_change(content, action, anchor, new_content, old_content):
+    """Apply a single change to file content."""
+    handler = CHANGE_ACTIONS.get(action)
+    if handler is None:
+        return content, f"Unknown action: {action}"
+    return handler(content, anchor, new_content, old_content)
 
 
 def create_backup(bucket, terraform_prefix, backup_prefix):
@@ -245,49 +281,103 @@ def create_backup(bucket, terraform_prefix, backup_prefix):
 
     # List and copy all .tf files
     paginator = s3_client.get_paginator('list_objects_v2')
-    backed_up = 0
+    pairs = []
 
-    for page in paginator.paginate(Bucket=bucket, Prefix=terraform_prefix):
+    pages = paginator.paginate(Bucket=bucket, Prefix=terraform_prefix, PaginationConfig={'PageSize': 1000})
+    for page in pages:
         for obj in page.get('Contents', []):
             key = obj['Key']
-            if key.endswith('.tf') or key.endswith('.tpl') or key.endswith('.tfvars'):
-                # Copy to backup location
+            if key.endswith(TERRAFORM_EXTENSIONS):
                 backup_key = key.replace(terraform_prefix, full_backup_prefix)
-                s3_client.copy_object(
-                    Bucket=bucket,
-                    CopySource={'Bucket': bucket, 'Key': key},
-                    Key=backup_key
-                )
-                backed_up += 1
+                pairs.append((key, backup_key))
 
-    return f"s3://{bucket}/{full_backup_prefix} ({backed_up} files)"
+    # Copy to backup location concurrently; consuming the results surfaces
+    # any failed copy
+    with ThreadPoolExecutor(max_workers=S3_COPY_WORKERS) as executor:
+        list(executor.map(
+            lambda pair: s3_client.copy_object(
+                Bucket=bucket,
+                CopySource={'Bucket': bucket, 'Key': pair[0]},
+                Key=pair[1]
+            ),
+            pairs
+        ))
+
+    return f"s3://{bucket}/{full_backup_prefix} ({len(pairs)} files)"
 
 
 def generate_diff_preview(old_content, new_content, filename):
-    """Generate a simple diff preview."""
+    """Generate a unified diff preview, limited to 50 lines."""
     old_lines = old_content.split('\n')
     new_lines = new_content.split('\n')
 
-    # Simple diff - show added/removed lines
-    preview_lines = [f"--- {filename} (original)", f"+++ {filename} (modified)"]
-
-    # Find differences (simplified)
-    import difflib
-    diff = difflib.unified_diff(
-        old_lines,
-        new_lines,
-        fromfile=f'{filename} (original)',
-        tofile=f'{filename} (modified)',
-        lineterm=''
-    )
-
-    preview_lines = list(diff)[:50]  # Limit preview size
-
-    return '\n'.join(preview_lines) if preview_lines else 'No changes detected'
+    # Trim the common prefix and suffix; edits here are anchored, so what
+    # remains is usually one small changed region
+    start = 0
+    limit = min(len(old_lines), len(new_lines))
+    while start < limit and old_lines[start] == new_lines[start]:
+        start += 1
+    end = 0
+    while end < limit - start and old_lines[-1 - end] == new_lines[-1 - end]:
+        end += 1
+    old_end = len(old_lines) - end
+    new_end = len(new_lines) - end
+
+    if start == old_end and start == new_end:
+        return 'No changes detected'
+
+    removed = old_lines[start:old_end]
+    added = new_lines[start:new_end]
+
+    # When the removed and added lines share something, difflib may split
+    # the region into finer hunks, so let it do the full comparison
+    if not set(removed).isdisjoint(added):
+        import difflib  # only this fallback needs it; keep it off cold start
+        diff = difflib.unified_diff(
+            old_lines,
+            new_lines,
+            fromfile=f'{filename} (original)',
+            tofile=f'{filename} (modified)',
+            lineterm=''
+        )
+        preview_lines = list(diff)[:50]  # Limit preview size
+        return '\n'.join(preview_lines) if preview_lines else 'No changes detected'
+
+    # Otherwise emit the single hunk directly, with difflib's three lines
+    # of context and header format
+    context_start = max(0, start - 3)
+    old_context_end = min(len(old_lines), old_end + 3)
+    new_context_end = min(len(new_lines), new_end + 3)
+
+    preview_lines = [
+        f"--- {filename} (original)",
+        f"+++ {filename} (modified)",
+        f"@@ -{format_hunk_range(context_start, old_context_end)} "
+        f"+{format_hunk_range(context_start, new_context_end)} @@"
+    ]
+    preview_lines.extend(' ' + line for line in old_lines[context_start:start])
+    preview_lines.extend('-' + line for line in removed)
+    preview_lines.extend('+' + line for line in added)
+    preview_lines.extend(' ' + line for line in old_lines[old_end:old_context_end])
+
+    return '\n'.join(preview_lines[:50])  # Limit preview size
+
+
+def format_hunk_range(start, stop):
+    """Format a line range for a unified diff hunk header, as difflib does."""
+    length = stop - start
+    if length == 1:
+        return f"{start + 1}"
+    if not length:
+        return f"{start},0"
+    return f"{start + 1},{length}"
 
 
 def format_response(event, body, status_code):
     """Format response for Bedrock Agent or direct invocation."""
+    # Compact separators: the body is embedded as a string in the agent's
+    # response, so every byte here is serialized (and escaped) twice
+    payload = json.dumps(body, separators=(',', ':'))
 
     if 'actionGroup' in event:
         return {
@@ -299,7 +389,7 @@ def format_response(event, body, status_code):
                 'httpStatusCode': status_code,
                 'responseBody': {
                     'application/json': {
-                        'body': json.dumps(body)
+                        'body': payload
                     }
                 }
             }
@@ -307,5 +397,5 @@ def format_response(event, body, status_code):
     else:
         return {
             'statusCode': status_code,
-            'body': json.dumps(body)
+            'body': payload
         }
@@ -6,9 +6,36 @@ Routes requests to appropriate Lambda functions based on apiPath.
 import boto3
 import json
 import os
-
-s3_client = boto3.client('s3')
-lambda_client = boto3.client('lambda')
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared client config: pooled connections for parallel S3 calls, adaptive
+# retries for throttling, and keep-alive on warm containers
+BOTO_CONFIG = Config(
+    max_pool_connections=32,
+    retries={'mode': 'adaptive', 'max_attempts': 5},
+    tcp_keepalive=True
+)
+
+S3_FETCH_WORKERS = 16
+TERRAFORM_EXTENSIONS = ('.tf', '.tpl', '.tfvars')
+
+# Lambda behind each routed apiPath. These run as separate functions because
+# each has its own environment, timeout and memory; /read-files is served here
+API_ROUTES = {
+    '/analyze': 'terraform-docs-analyze',
+    '/generate-docs': 'terraform-docs-generate',
+    '/generate-diagram': 'terraform-docs-diagram',
+    '/get-deployed-resources': 'terraform-docs-deployed',
+    '/terraform-operation': 'terraform-docs-operations',
+    '/get-status': 'terraform-docs-status',
+    '/modify-code': 'terraform-docs-modify-code',
+    '/run-tests': 'terraform-docs-run-tests'
+}
+SUPPORTED_PATHS_MESSAGE = f"Supported paths: {', '.join(['/read-files', *API_ROUTES])}"
+
+s3_client = boto3.client('s3', config=BOTO_CONFIG)
+lambda_client = boto3.client('lambda', config=BOTO_CONFIG)
 
 
 def lambda_handler(event, context):
@@ -21,31 +48,19 @@ def lambda_handler(event, context):
     if 'actionGroup' in event:
         api_path = event.get('apiPath', '')
 
-        # Route to appropriate Lambda based on apiPath
-        if api_path == '/generate-docs':
-            return invoke_lambda('terraform-docs-generate', event)
-        elif api_path == '/generate-diagram':
-            return invoke_lambda('terraform-docs-diagram', event)
-        elif api_path == '/get-deployed-resources':
-            return invoke_lambda('terraform-docs-deployed', event)
-        elif api_path == '/analyze':
-            return invoke_lambda('terraform-docs-analyze', event)
-        elif api_path == '/terraform-operation':
-            return invoke_lambda('terraform-docs-operations', event)
-        elif api_path == '/get-status':
-            return invoke_lambda('terraform-docs-status', event)
-        elif api_path == '/modify-code':
-            return invoke_lambda('terraform-docs-modify-code', event)
-        elif api_path == '/run-tests':
-            return invoke_lambda('terraform-docs-run-tests', event)
-        elif api_path == '/read-files':
-            # Handle read-files locally
+        # Handle read-files locally
+        if api_path == '/read-files':
             return handle_read_files(event)
-        else:
-            return format_response(event, {
-                'error': f'Unknown apiPath: {api_path}',
-                'message': 'Supported paths: /read-files, /analyze, /generate-docs, /generate-diagram, /get-deployed-resources, /terraform-operation, /get-status, /modify-code, /run-tests'
-            }, 400)
+
+        # Route to appropriate Lambda based on apiPath
+        function_name = API_ROUTES.get(api_path)
+        if function_name:
+            return invoke_lambda(function_name, event)
+
+        return format_response(event, {
+            'error': f'Unknown apiPath: {api_path}',
+            'message': SUPPORTED_PATHS_MESSAGE
+        }, 400)
 
     # Direct invocation - handle read-files
     return handle_read_files(event)
@@ -57,11 +72,11 @@ def invoke_lambda(function_name, event):
         response = lambda_client.invoke(
             FunctionName=function_name,
             InvocationType='RequestResponse',
-            Payload=json.dumps(event)
+            Payload=json.dumps(event, separators=(',', ':'))
         )
 
-        payload = json.loads(response['Payload'].read().decode('utf-8'))
-        return payload
+        # json.loads takes the payload bytes directly, no decode copy needed
+        return json.loads(response['Payload'].read())
 
     except Exception as e:
         return format_response(event, {
@@ -73,16 +88,14 @@ def invoke_lambda(function_name, event):
 def handle_read_files(event):
     """
     Reads Terraform files from S3 bucket.
+
+    Every key under the prefix is listed and filtered by extension, so the
+    prefix should hold only the Terraform tree.
     """
 
     # Handle Bedrock Agent event format
     if 'actionGroup' in event:
-        params = {}
-        if 'requestBody' in event and 'content' in event['requestBody']:
-            body = event['requestBody']['content'].get('application/json', {})
-            if 'properties' in body:
-                for prop in body['properties']:
-                    params[prop['name']] = prop['value']
+        params = parse_agent_params(event)
 
         bucket = params.get('bucket', os.environ.get('TERRAFORM_BUCKET'))
         prefix = params.get('prefix', 'terraform/')
@@ -103,25 +116,36 @@ def handle_read_files(event):
     try:
         paginator = s3_client.get_paginator('list_objects_v2')
 
-        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        # Pick the files to read from the listed sizes, so the budget is
+        # settled before any object is downloaded; files that would overrun
+        # it are skipped rather than fetched and discarded
+        keys = []
+        listed_size = 0
+        pages = paginator.paginate(Bucket=bucket, Prefix=prefix, PaginationConfig={'PageSize': 1000})
+        for page in pages:
             for obj in page.get('Contents', []):
                 key = obj['Key']
 
-                if key.endswith('.tf') or key.endswith('.tpl') or key.endswith('.tfvars'):
-                    if total_size >= max_total_size:
+                if key.endswith(TERRAFORM_EXTENSIONS):
+                    if listed_size + obj['Size'] > max_total_size:
                         continue
 
-                    response = s3_client.get_object(Bucket=bucket, Key=key)
-                    content = response['Body'].read().decode('utf-8')
+                    keys.append(key)
+                    listed_size += obj['Size']
 
-                    total_size += len(content)
+        # Fetch concurrently; map() keeps results in listing order
+        with ThreadPoolExecutor(max_workers=S3_FETCH_WORKERS) as executor:
+            contents = list(executor.map(lambda key: read_s3_object(bucket, key), keys))
 
-                    files.append({
-                        'name': key.replace(prefix, ''),
-                        'path': key,
-                        'content': content,
-                        'size': len(content)
-                    })
+        for key, content in zip(keys, contents):
+            total_size += len(content)
+
+            files.append({
+                'name': key.replace(prefix, ''),
+                'path': key,
+                'content': content,
+                'size': len(content)
+            })
 
         result = {
             'files': files,
@@ -145,8 +169,27 @@ def handle_read_files(event):
         }, 500)
 
 
+def parse_agent_params(event):
+    """Collect a Bedrock Agent event's parameters and body properties."""
+    body = event.get('requestBody', {}).get('content', {}).get('application/json', {})
+    params = {param['name']: param['value'] for param in event.get('parameters', [])}
+    params.update({prop['name']: prop['value'] for prop in body.get('properties', [])})
+    return params
+
+
+def read_s3_object(bucket, key):
+    """
+    Reads and decodes a single S3 object.
+    """
+    response = s3_client.get_object(Bucket=bucket, Key=key)
+    return response['Body'].read().decode('utf-8')
+
+
 def format_response(event, body, status_code):
     """Format response for Bedrock Agent or direct invocation."""
+    # Compact separators: the body is embedded as a string in the agent's
+    # response, so every byte here is serialized (and escaped) twice
+    payload = json.dumps(body, separators=(',', ':'))
 
     if 'actionGroup' in event:
         return {
@@ -158,7 +201,7 @@ def format_response(event, body, status_code):
                 'httpStatusCode': status_code,
                 'responseBody': {
                     'application/json': {
-                        'body': json.dumps(body)
+                        'body': payload
                     }
                 }
             }
@@ -166,5 +209,5 @@ def format_response(event, body, status_code):
     else:
         return {
             'statusCode': status_code,
-            'body': json.dumps(body)
+            'body': payload
         }
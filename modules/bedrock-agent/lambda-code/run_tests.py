@@ -3,15 +3,60 @@ Lambda 7: Run Infrastructure Tests
 Runs infrastructure validation tests after deployment.
 """
 
-import boto3
+import errno
 import json
 import os
 import socket
+import struct
+import threading
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-s3_client = boto3.client('s3')
-ec2_client = boto3.client('ec2')
+from concurrent.futures import ThreadPoolExecutor
+
+# Per-probe TCP connect timeout. Targets are in-region, so a port that
+# hasn't answered in a couple of seconds is filtered, not slow
+PORT_PROBE_TIMEOUT = int(os.environ.get('PORT_PROBE_TIMEOUT_MS', '2000')) / 1000
+
+# Tests run by each suite, in report order
+TEST_SUITES = {
+    'quick': ['fortigate_https', 'fortigate_ssh'],
+    'connectivity': ['fortigate_https', 'fortigate_ssh', 'vpn_ports'],
+    'vpn': ['fortigate_https', 'vpn_ports', 'vpn_tunnel_status'],
+    'services': ['fortigate_https', 'fortigate_ssh', 'vpn_ports',
+                 'vpn_tunnel_status', 'cross_vpc_connectivity'],
+    'full': ['fortigate_https', 'fortigate_ssh', 'vpn_ports',
+             'vpn_tunnel_status', 'cross_vpc_connectivity',
+             'routing', 'security_groups']
+}
+
+# Summary counter for each test status; anything else counts as skipped
+SUMMARY_KEYS = {
+    'PASSED': 'passed',
+    'FAILED': 'failed',
+    'MANUAL_CHECK_REQUIRED': 'manual_check'
+}
+
+# Last outputs.json read and its ETag; warm invocations revalidate with a
+# conditional GET, so unchanged outputs are neither downloaded nor parsed
+_OUTPUTS_CACHE = {'etag': None, 'outputs': None}
+
+# Clients are created on first use: the common suites only probe ports, so
+# a cold start shouldn't pay to import boto3 or load the S3 and EC2 service
+# models. Tests run on threads, and client creation on the default session
+# isn't thread-safe
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(service):
+    """Return the shared client for a service, creating it on first use."""
+    client = _CLIENTS.get(service)
+    if client is None:
+        with _CLIENTS_LOCK:
+            client = _CLIENTS.get(service)
+            if client is None:
+                import boto3  # port-only suites never load the SDK
+                client = _CLIENTS[service] = boto3.client(service)
+    return client
 
 
 def lambda_handler(event, context):
@@ -71,57 +116,33 @@ def lambda_handler(event, context):
         }
     }
 
-    # Define test suites
-    test_suites = {
-        'quick': ['fortigate_https', 'fortigate_ssh'],
-        'connectivity': ['fortigate_https', 'fortigate_ssh', 'vpn_ports'],
-        'vpn': ['fortigate_https', 'vpn_ports', 'vpn_tunnel_status'],
-        'services': ['fortigate_https', 'fortigate_ssh', 'vpn_ports',
-                    'vpn_tunnel_status', 'cross_vpc_connectivity'],
-        'full': ['fortigate_https', 'fortigate_ssh', 'vpn_ports',
-                'vpn_tunnel_status', 'cross_vpc_connectivity',
-                'routing', 'security_groups']
-    }
+    tests_to_run = TEST_SUITES.get(test_suite, TEST_SUITES['quick'])
 
-    tests_to_run = test_suites.get(test_suite, test_suites['quick'])
-
-    # Map test names to functions
-    test_functions = {
-        'fortigate_https': test_fortigate_https,
-        'fortigate_ssh': test_fortigate_ssh,
-        'vpn_ports': test_vpn_ports,
-        'vpn_tunnel_status': test_vpn_tunnel_status,
-        'cross_vpc_connectivity': test_cross_vpc_connectivity,
-        'routing': test_routing,
-        'security_groups': test_security_groups
-    }
+    # Run tests concurrently; they are independent and mostly wait on
+    # sockets or the EC2 API. Results are collected in suite order
+    with ThreadPoolExecutor(max_workers=len(tests_to_run)) as executor:
+        futures = [
+            (test_name, executor.submit(TEST_FUNCTIONS[test_name], targets))
+            for test_name in tests_to_run if test_name in TEST_FUNCTIONS
+        ]
 
-    # Run tests
-    for test_name in tests_to_run:
-        if test_name in test_functions:
-            try:
-                test_result = test_functions[test_name](targets)
-                results['tests'].append(test_result)
-                results['summary']['total'] += 1
-
-                status = test_result.get('status', 'UNKNOWN')
-                if status == 'PASSED':
-                    results['summary']['passed'] += 1
-                elif status == 'FAILED':
-                    results['summary']['failed'] += 1
-                elif status == 'MANUAL_CHECK_REQUIRED':
-                    results['summary']['manual_check'] += 1
-                else:
-                    results['summary']['skipped'] += 1
-
-            except Exception as e:
-                results['tests'].append({
-                    'name': test_name,
-                    'status': 'ERROR',
-                    'error': str(e)
-                })
-                results['summary']['failed'] += 1
-                results['summary']['total'] += 1
+    for test_name, future in futures:
+        try:
+            test_result = future.result()
+            results['tests'].append(test_result)
+            results['summary']['total'] += 1
+
+            status = test_result.get('status', 'UNKNOWN')
+            results['summary'][SUMMARY_KEYS.get(status, 'skipped')] += 1
+
+        except Exception as e:
+            results['tests'].append({
+                'name': test_name,
+                'status': 'ERROR',
+                'error': str(e)
+            })
+            results['summary']['failed'] += 1
+            results['summary']['total'] += 1
 
     # Determine overall status
     if results['summary']['failed'] == 0 and results['summary']['manual_check'] == 0:
@@ -131,8 +152,10 @@ def lambda_handler(event, context):
     else:
         results['status'] = 'FAILED'
 
-    # Generate report
-    results['report'] = generate_test_report(results)
+    # Generate the human-readable report for direct callers only; the agent
+    # works from the structured results (report isn't in its API schema)
+    if 'actionGroup' not in event:
+        results['report'] = generate_test_report(results)
 
     return format_response(event, results, 200)
 
@@ -150,11 +173,7 @@ def get_targets_from_env_or_state():
     state_bucket = os.environ.get('STATE_BUCKET')
     if state_bucket and not all(targets.values()):
         try:
-            response = s3_client.get_object(
-                Bucket=state_bucket,
-                Key='terraform/outputs.json'
-            )
-            outputs = json.loads(response['Body'].read().decode('utf-8'))
+            outputs = read_terraform_outputs(state_bucket)
 
             if not targets['fortigate1_ip']:
                 targets['fortigate1_ip'] = outputs.get('fortigate1_public_ip', {}).get('value')
@@ -170,24 +189,29 @@ def get_targets_from_env_or_state():
     return targets
 
 
-def test_fortigate_https(targets):
-    """Test FortiGate web console accessibility (HTTPS port 443)."""
-    results = []
+def read_terraform_outputs(bucket):
+    """Return the parsed outputs.json, reusing the cached copy if unchanged."""
+    params = {'Bucket': bucket, 'Key': 'terraform/outputs.json'}
+    if _OUTPUTS_CACHE['etag']:
+        params['IfNoneMatch'] = _OUTPUTS_CACHE['etag']
 
-    for name, ip in [('FortiGate-1', targets.get('fortigate1_ip')),
-                     ('FortiGate-2', targets.get('fortigate2_ip'))]:
-        if not ip:
-            results.append({'target': name, 'status': 'SKIPPED', 'reason': 'IP not available'})
-            continue
+    s3_client = get_client('s3')
+    try:
+        response = s3_client.get_object(**params)
+    except s3_client.exceptions.ClientError as e:
+        if _OUTPUTS_CACHE['etag'] and e.response['ResponseMetadata'].get('HTTPStatusCode') == 304:
+            return _OUTPUTS_CACHE['outputs']
+        raise
+
+    outputs = json.loads(response['Body'].read())
+    _OUTPUTS_CACHE['etag'] = response['ETag']
+    _OUTPUTS_CACHE['outputs'] = outputs
+    return outputs
 
-        status, message = check_port(ip, 443, timeout=10)
-        results.append({
-            'target': name,
-            'ip': ip,
-            'port': 443,
-            'status': status,
-            'message': message
-        })
+
+def test_fortigate_https(targets):
+    """Test FortiGate web console accessibility (HTTPS port 443)."""
+    results = check_fortigate_port(targets, 443)
 
     all_passed = all(r.get('status') == 'OPEN' for r in results if r.get('status') != 'SKIPPED')
 
@@ -201,22 +225,7 @@ def test_fortigate_https(targets):
 
 def test_fortigate_ssh(targets):
     """Test FortiGate SSH accessibility (port 22)."""
-    results = []
-
-    for name, ip in [('FortiGate-1', targets.get('fortigate1_ip')),
-                     ('FortiGate-2', targets.get('fortigate2_ip'))]:
-        if not ip:
-            results.append({'target': name, 'status': 'SKIPPED', 'reason': 'IP not available'})
-            continue
-
-        status, message = check_port(ip, 22, timeout=10)
-        results.append({
-            'target': name,
-            'ip': ip,
-            'port': 22,
-            'status': status,
-            'message': message
-        })
+    results = check_fortigate_port(targets, 22)
 
     all_passed = all(r.get('status') == 'OPEN' for r in results if r.get('status') != 'SKIPPED')
 
@@ -228,6 +237,28 @@ def test_fortigate_ssh(targets):
     }
 
 
+def check_fortigate_port(targets, port):
+    """Probe a TCP port on both FortiGates at once."""
+    def check_target(target):
+        name, ip = target
+        if not ip:
+            return {'target': name, 'status': 'SKIPPED', 'reason': 'IP not available'}
+
+        status, message = check_port(ip, port)
+        return {
+            'target': name,
+            'ip': ip,
+            'port': port,
+            'status': status,
+            'message': message
+        }
+
+    fortigates = [('FortiGate-1', targets.get('fortigate1_ip')),
+                  ('FortiGate-2', targets.get('fortigate2_ip'))]
+    with ThreadPoolExecutor(max_workers=len(fortigates)) as executor:
+        return list(executor.map(check_target, fortigates))
+
+
 def test_vpn_ports(targets):
     """Test VPN ports (UDP 500 for IKE, UDP 4500 for NAT-T)."""
     results = []
@@ -295,42 +326,31 @@ def test_cross_vpc_connectivity(targets):
 
 def test_routing(targets):
     """Verify route tables are correctly configured."""
-    try:
-        # Check route tables via AWS API
-        response = ec2_client.describe_route_tables()
-
-        route_tables = []
-        for rt in response.get('RouteTables', []):
-            rt_info = {
-                'id': rt.get('RouteTableId'),
-                'vpc_id': rt.get('VpcId'),
-                'routes': []
-            }
-
-            for route in rt.get('Routes', []):
-                rt_info['routes'].append({
-                    'destination': route.get('DestinationCidrBlock'),
-                    'target': route.get('GatewayId') or route.get('NetworkInterfaceId') or route.get('NatGatewayId')
-                })
-
-            route_tables.append(rt_info)
-
+    # Nothing is deployed to route between, so skip the EC2 call
+    if not targets.get('fortigate1_ip') and not targets.get('fortigate2_ip'):
         return {
             'name': 'Route Table Configuration',
             'description': 'Verify routes are configured for cross-VPC traffic',
-            'status': 'PASSED',
-            'details': {
-                'route_tables_found': len(route_tables),
-                'note': 'Routes should point to FortiGate private ENI for cross-VPC traffic'
-            }
+            'status': 'SKIPPED',
+            'reason': 'FortiGate IPs not available'
         }
 
-    except Exception as e:
-        return {
-            'name': 'Route Table Configuration',
-            'status': 'ERROR',
-            'error': str(e)
+    # Check route tables via AWS API; only the count is reported, so page
+    # through the IDs rather than building the full route list. API errors
+    # propagate to the handler, which records the test as a failure
+    paginator = get_client('ec2').get_paginator('describe_route_tables')
+    pages = paginator.paginate(PaginationConfig={'PageSize': 100})
+    route_tables_found = sum(1 for _ in pages.search('RouteTables[].RouteTableId'))
+
+    return {
+        'name': 'Route Table Configuration',
+        'description': 'Verify routes are configured for cross-VPC traffic',
+        'status': 'PASSED',
+        'details': {
+            'route_tables_found': route_tables_found,
+            'note': 'Routes should point to FortiGate private ENI for cross-VPC traffic'
         }
+    }
 
 
 def test_security_groups(targets):
@@ -352,16 +372,51 @@ def test_security_groups(targets):
     }
 
 
-def check_port(ip, port, timeout=5):
-    """Check if a TCP port is open."""
+# Map test names to functions
+TEST_FUNCTIONS = {
+    'fortigate_https': test_fortigate_https,
+    'fortigate_ssh': test_fortigate_ssh,
+    'vpn_ports': test_vpn_ports,
+    'vpn_tunnel_status': test_vpn_tunnel_status,
+    'cross_vpc_connectivity': test_cross_vpc_connectivity,
+    'routing': test_routing,
+    'security_groups': test_security_groups
+}
+
+
+def check_port(ip, port, timeout=None):
+    """Check if a TCP port is open on any of the target's addresses."""
+    try:
+        addresses = socket.getaddrinfo(ip, port, type=socket.SOCK_STREAM)
+    except Exception as e:
+        return 'ERROR', str(e)
+
+    if len(addresses) == 1:
+        return check_address(addresses[0], port, timeout)
+
+    # Dual-stack target: probe every address at once and take the first
+    # that answers, so an unreachable family doesn't decide the result
+    with ThreadPoolExecutor(max_workers=len(addresses)) as executor:
+        results = list(executor.map(lambda address: check_address(address, port, timeout), addresses))
+    return next((result for result in results if result[0] == 'OPEN'), results[0])
+
+
+def check_address(address, port, timeout=None):
+    """Check one resolved address with a single connect attempt."""
+    family, sock_type, proto, _, sockaddr = address
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-        result = sock.connect_ex((ip, port))
-        sock.close()
+        with socket.socket(family, sock_type, proto) as sock:
+            # Close with an RST: the probe sends no data, and this keeps
+            # repeated runs from piling up sockets in TIME_WAIT
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            sock.settimeout(PORT_PROBE_TIMEOUT if timeout is None else timeout)
+            result = sock.connect_ex(sockaddr)
 
         if result == 0:
             return 'OPEN', f'Port {port} is open'
+        # connect_ex reports a timeout as EWOULDBLOCK rather than raising
+        elif result in (errno.EAGAIN, errno.EWOULDBLOCK, errno.ETIMEDOUT):
+            return 'TIMEOUT', f'Connection to port {port} timed out'
         else:
             return 'CLOSED', f'Port {port} is closed (error code: {result})'
     except socket.timeout:
@@ -407,6 +462,9 @@ def generate_test_report(results):
 
 def format_response(event, body, status_code):
     """Format response for Bedrock Agent or direct invocation."""
+    # Compact separators: the body is embedded as a string in the agent's
+    # response, so every byte here is serialized (and escaped) twice
+    payload = json.dumps(body, separators=(',', ':'))
 
     if 'actionGroup' in event:
         return {
@@ -418,7 +476,7 @@ def format_response(event, body, status_code):
                 'httpStatusCode': status_code,
                 'responseBody': {
                     'application/json': {
-                        'body': json.dumps(body)
+                        'body': payload
                     }
                 }
             }
@@ -426,5 +484,5 @@ def format_response(event, body, status_code):
     else:
         return {
             'statusCode': status_code,
-            'body': json.dumps(body)
+            'body': payload
         }
@@ -10,6 +10,24 @@ import uuid
 
 codebuild_client = boto3.client('codebuild')
 
+# Function configuration is fixed for the life of the container
+CODEBUILD_PROJECT = os.environ.get('CODEBUILD_PROJECT', 'terraform-docs-executor')
+TERRAFORM_BUCKET = os.environ.get('TERRAFORM_BUCKET')
+STATE_BUCKET = os.environ.get('STATE_BUCKET')
+TERRAFORM_VERSION = os.environ.get('TERRAFORM_VERSION', '1.6.0')
+CONSOLE_URL_PREFIX = (
+    f"https://{os.environ.get('AWS_REGION', 'us-east-2')}.console.aws.amazon.com/codesuite/codebuild/"
+)
+
+VALID_OPERATIONS = ['plan', 'apply', 'destroy', 'output', 'state', 'validate']
+
+# CodeBuild environment entries that don't depend on the request
+STATIC_ENV_VARS = [
+    {'name': 'TERRAFORM_BUCKET', 'value': TERRAFORM_BUCKET or '', 'type': 'PLAINTEXT'},
+    {'name': 'STATE_BUCKET', 'value': STATE_BUCKET or '', 'type': 'PLAINTEXT'},
+    {'name': 'TERRAFORM_VERSION', 'value': TERRAFORM_VERSION, 'type': 'PLAINTEXT'},
+]
+
 
 def lambda_handler(event, context):
     """
@@ -45,19 +63,12 @@ def lambda_handler(event, context):
         auto_approve = event.get('auto_approve', False)
         variables = event.get('variables', {})
 
-    # Get environment variables
-    codebuild_project = os.environ.get('CODEBUILD_PROJECT', 'terraform-docs-executor')
-    terraform_bucket = os.environ.get('TERRAFORM_BUCKET')
-    state_bucket = os.environ.get('STATE_BUCKET')
-    terraform_version = os.environ.get('TERRAFORM_VERSION', '1.6.0')
-
     # Validate operation
-    valid_operations = ['plan', 'apply', 'destroy', 'output', 'state', 'validate']
-    if operation not in valid_operations:
+    if operation not in VALID_OPERATIONS:
         return format_response(event, {
             'error': f'Invalid operation: {operation}',
-            'valid_operations': valid_operations,
-            'message': f'Please use one of: {", ".join(valid_operations)}'
+            'valid_operations': VALID_OPERATIONS,
+            'message': f'Please use one of: {", ".join(VALID_OPERATIONS)}'
         }, 400)
 
     # Security check for destructive operations
@@ -75,9 +86,7 @@ def lambda_handler(event, context):
     env_vars = [
         {'name': 'TF_OPERATION', 'value': operation, 'type': 'PLAINTEXT'},
         {'name': 'TF_AUTO_APPROVE', 'value': str(auto_approve).lower(), 'type': 'PLAINTEXT'},
-        {'name': 'TERRAFORM_BUCKET', 'value': terraform_bucket or '', 'type': 'PLAINTEXT'},
-        {'name': 'STATE_BUCKET', 'value': state_bucket or '', 'type': 'PLAINTEXT'},
-        {'name': 'TERRAFORM_VERSION', 'value': terraform_version, 'type': 'PLAINTEXT'},
+        *STATIC_ENV_VARS
     ]
 
     # Add Terraform variables
@@ -94,7 +103,7 @@ def lambda_handler(event, context):
     try:
         # Start CodeBuild project
         response = codebuild_client.start_build(
-            projectName=codebuild_project,
+            projectName=CODEBUILD_PROJECT,
             environmentVariablesOverride=env_vars
         )
 
@@ -103,13 +112,12 @@ def lambda_handler(event, context):
 
         # Get log stream info
         logs = build.get('logs', {})
-        log_group = logs.get('groupName', f'/aws/codebuild/{codebuild_project}')
+        log_group = logs.get('groupName', f'/aws/codebuild/{CODEBUILD_PROJECT}')
 
         # Build console URL
-        region = os.environ.get('AWS_REGION', 'us-east-2')
         console_url = (
-            f'https://{region}.console.aws.amazon.com/codesuite/codebuild/'
-            f'{build["arn"].split(":")[4]}/projects/{codebuild_project}/'
+            f'{CONSOLE_URL_PREFIX}'
+            f'{build["arn"].split(":")[4]}/projects/{CODEBUILD_PROJECT}/'
             f'build/{build_id.replace(":", "%3A")}'
         )
 
@@ -136,7 +144,7 @@ def lambda_handler(event, context):
 
     except codebuild_client.exceptions.ResourceNotFoundException:
         return format_response(event, {
-            'error': f'CodeBuild project not found: {codebuild_project}',
+            'error': f'CodeBuild project not found: {CODEBUILD_PROJECT}',
             'message': 'Please ensure the CodeBuild project exists'
         }, 404)
     except Exception as e:
@@ -149,6 +157,9 @@ def lambda_handler(event, context):
 
 def format_response(event, body, status_code):
     """Format response for Bedrock Agent or direct invocation."""
+    # Compact separators: the body is embedded as a string in the agent's
+    # response, so every byte here is serialized (and escaped) twice
+    payload = json.dumps(body, separators=(',', ':'))
 
     if 'actionGroup' in event:
         return {
@@ -160,7 +171,7 @@ def format_response(event, body, status_code):
                 'httpStatusCode': status_code,
                 'responseBody': {
                     'application/json': {
-                        'body': json.dumps(body)
+                        'body': payload
                     }
                 }
             }
@@ -168,5 +179,5 @@ def format_response(event, body, status_code):
     else:
         return {
             'statusCode': status_code,
-            'body': json.dumps(body)
+            'body': payload
         }
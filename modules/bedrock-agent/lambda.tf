@@ -84,8 +84,9 @@ resource "aws_lambda_function" "generate" {
 
   environment {
     variables = {
-      TERRAFORM_BUCKET = aws_s3_bucket.terraform_files.id
-      OUTPUT_BUCKET    = aws_s3_bucket.output_docs.id
+      TERRAFORM_BUCKET     = aws_s3_bucket.terraform_files.id
+      OUTPUT_BUCKET        = aws_s3_bucket.output_docs.id
+      RESPONSE_CACHE_TABLE = aws_dynamodb_table.response_cache.name
     }
   }
 
@@ -240,7 +241,9 @@ resource "aws_lambda_function" "generate_diagram" {
 
   environment {
     variables = {
-      TERRAFORM_BUCKET = aws_s3_bucket.terraform_files.id
+      TERRAFORM_BUCKET     = aws_s3_bucket.terraform_files.id
+      BEDROCK_LATENCY      = var.diagram_bedrock_latency
+      RESPONSE_CACHE_TABLE = aws_dynamodb_table.response_cache.name
     }
   }
 
@@ -140,6 +140,30 @@ resource "aws_s3_object" "openapi_schema" {
   tags = var.tags
 }
 
+# -----------------------------------------------------------------------------
+# Bedrock Response Cache
+# -----------------------------------------------------------------------------
+
+# Generated docs and diagrams keyed by model, prompt and Terraform content
+# hash, so unchanged content skips the Bedrock call across Lambda containers
+resource "aws_dynamodb_table" "response_cache" {
+  name         = "${local.resource_prefix}-response-cache"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "cache_key"
+
+  attribute {
+    name = "cache_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
+
 # -----------------------------------------------------------------------------
 # Bedrock Agent
 # -----------------------------------------------------------------------------
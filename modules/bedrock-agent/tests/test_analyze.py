@@ -0,0 +1,66 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda-code'))
+
+import analyze
+
+
+def test_extract_locals_one_line_block():
+    doc = analyze.ParsedDoc('locals { region = "us-east-1" }\n')
+    assert analyze.extract_locals(doc) == ['region']
+
+
+def test_extract_locals_skips_map_keys():
+    doc = analyze.ParsedDoc(
+        'locals {\n'
+        '  name = "app"\n'
+        '  tags = {\n'
+        '    Owner = "ops"\n'
+        '  }\n'
+        '}\n'
+    )
+    assert sorted(analyze.extract_locals(doc)) == ['name', 'tags']
+
+
+class FakeBody:
+    def __init__(self, text):
+        self.text = text
+
+    def read(self):
+        return self.text.encode('utf-8')
+
+
+class FakePaginator:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def paginate(self, Bucket, Prefix, PaginationConfig=None):
+        contents = [{'Key': key} for key in self.objects if key.startswith(Prefix)]
+        # S3 leaves Contents out of a page when nothing matches the prefix
+        return [{'Contents': contents}] if contents else [{'KeyCount': 0}]
+
+
+class FakeS3:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def get_paginator(self, name):
+        return FakePaginator(self.objects)
+
+    def get_object(self, Bucket, Key):
+        return {'Body': FakeBody(self.objects[Key])}
+
+
+def test_read_terraform_files_falls_back_when_module_prefix_is_empty(monkeypatch):
+    objects = {
+        'terraform/main.tf': 'module "vpc" {}\n',
+        'terraform/vpc/main.tf': 'resource "aws_vpc" "main" {}\n',
+        'terraform/vpc/README.md': '# vpc\n',
+    }
+    monkeypatch.setattr(analyze, '_s3', FakeS3(objects))
+
+    content, files = analyze.read_terraform_files('bucket', module_filter='vpc')
+
+    assert files == ['vpc/main.tf']
+    assert content == objects['terraform/vpc/main.tf']
@@ -38,6 +38,17 @@ variable "lambda_memory" {
   default     = 256
 }
 
+variable "diagram_bedrock_latency" {
+  description = "Bedrock latency mode for diagram generation: standard (uses prompt caching) or optimized"
+  type        = string
+  default     = "standard"
+
+  validation {
+    condition     = contains(["standard", "optimized"], var.diagram_bedrock_latency)
+    error_message = "diagram_bedrock_latency must be \"standard\" or \"optimized\"."
+  }
+}
+
 variable "terraform_version" {
   description = "Terraform version to install in CodeBuild"
   type        = string
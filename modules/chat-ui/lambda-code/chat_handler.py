@@ -16,12 +16,25 @@ bedrock_agent_runtime = boto3.client('bedrock-agent-runtime', config=config)
 AGENT_ID = os.environ.get('AGENT_ID')
 AGENT_ALIAS_ID = os.environ.get('AGENT_ALIAS_ID')
 
+# Headers are the same on every response, and preflights need no work at all
+CORS_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,x-api-key,Authorization',
+    'Access-Control-Allow-Methods': 'POST,OPTIONS'
+}
+PREFLIGHT_RESPONSE = {
+    'statusCode': 200,
+    'headers': CORS_HEADERS,
+    'body': '{}'
+}
+
 def lambda_handler(event, context):
     """Handle chat requests and invoke Bedrock Agent."""
 
     # Handle CORS preflight
     if event.get('httpMethod') == 'OPTIONS':
-        return cors_response(200, {})
+        return PREFLIGHT_RESPONSE
 
     try:
         # Parse request body
@@ -58,13 +71,16 @@ def invoke_agent(message: str, session_id: str) -> str:
         enableTrace=False
     )
 
-    # Collect the streaming response
-    completion = ""
+    # Collect the streaming response; chunks are joined before decoding so a
+    # UTF-8 character split across two chunks still decodes
+    parts = []
     for event in response.get('completion', []):
         if 'chunk' in event:
             chunk_data = event['chunk']
             if 'bytes' in chunk_data:
-                completion += chunk_data['bytes'].decode('utf-8')
+                parts.append(chunk_data['bytes'])
+
+    completion = b''.join(parts).decode('utf-8')
 
     return completion if completion else "No response from agent"
 
@@ -73,11 +89,6 @@ def cors_response(status_code: int, body: dict) -> dict:
     """Return response with CORS headers."""
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,x-api-key,Authorization',
-            'Access-Control-Allow-Methods': 'POST,OPTIONS'
-        },
-        'body': json.dumps(body)
+        'headers': CORS_HEADERS,
+        'body': json.dumps(body, separators=(',', ':'))
     }